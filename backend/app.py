@@ -1,18 +1,19 @@
-from flask import Flask, jsonify, render_template, session, redirect
+from flask import Flask, current_app, jsonify, render_template, request, session, redirect
 import os
 from flask_cors import CORS
-from backend.routes.plans import (
-    plans_bp,
-    calculate_balance,
-    calculate_reimbursements,
-    get_plan_expenses_api,
-)
+from backend.routes.plans import plans_bp, plan_reimbursements
+from backend.routes.plans.helpers import list_user_plans
 from backend.routes.auth import auth_bp
-from backend.models import db, User, Plan, PlanParticipant, Expense
+from backend.models import db, Plan, PlanParticipant
+from backend.utils.netting import net_positions
+from backend.cli import register_commands
+from backend.utils.auth import get_current_user, get_current_user_id, record_user_lookups
+from backend.utils.guest_reaper import start_guest_reaper
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from sqlalchemy.engine.url import make_url
 from pathlib import Path
-from datetime import timezone
+from datetime import datetime, timezone
 from prometheus_flask_exporter import PrometheusMetrics
 
 # Initialize Flask-Migrate (database migrations)
@@ -20,47 +21,45 @@ migrate = Migrate()
 
 
 def index():
-    username = session.get("username")
-    if not username:
+    if not session.get("username"):
         return redirect("/home")
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = get_current_user_id()
+    if user_id is None:
         return jsonify({"error": "User not found"}), 404
-    user_plans = []
+    # "net" nets the user's position per counterparty across all plans in one
+    # query; "plan" settles every plan separately.
+    mode = request.args.get("mode") or current_app.config.get("HOME_REIMBURSEMENTS_MODE", "plan")
+    net_mode = mode == "net"
+    # Only the 4 most recent plans are shown; sorting and limiting happen in SQL
+    user_plans = list_user_plans(user_id, sort="created_at", descending=True, limit=4)
     user_reimbursements = []
-    for participation in user.participations:
-        plan = Plan.query.filter_by(id=participation.plan_id).first()
-        if not plan:
-            continue
-        participant_rows = PlanParticipant.query.filter_by(plan_id=plan.id).all()
-        expenses_rows = Expense.query.filter_by(plan_id=plan.id).all()
-        user_plans.append(
-            {
-                "id": plan.id,
-                "name": plan.name,
-                "hash_id": plan.hash_id,
-                "created_at": plan.created_at.isoformat(),
-                "participants": [p.name for p in participant_rows],
-                "total_expenses": sum(
-                    e.amount for e in expenses_rows if e.description != "Reimbursement"
-                ),
-            }
+    if not net_mode:
+        memberships = (
+            db.session.query(PlanParticipant.name, Plan)
+            .join(Plan, Plan.id == PlanParticipant.plan_id)
+            .filter(PlanParticipant.user_id == user_id)
+            .order_by(PlanParticipant.id)
+            .all()
         )
-        # Calculate reimbursements for this plan
-        expenses_json = get_plan_expenses_api(participation.plan.hash_id).get_json()
-        balances = calculate_balance(expenses_json)
-        reimbursements = calculate_reimbursements(balances)
-        for r in reimbursements:
-            r["plan_hash_id"] = participation.plan.hash_id
-            if r["from"] == participation.name:
-                r["from"] = f"You ({r['from']})"
-                user_reimbursements.append(r)
-            elif r["to"] == participation.name:
-                r["to"] = f"You ({r['to']})"
-                user_reimbursements.append(r)
-    # Limit after collecting all plans
-    user_plans = sorted(user_plans, key=lambda p: p["created_at"], reverse=True)[:4]
-    return render_template("index.html", plans=user_plans, reimbursments=user_reimbursements)
+        for participant_name, plan in memberships:
+            # Calculate reimbursements for this plan
+            reimbursements = plan_reimbursements(plan)
+            for r in reimbursements:
+                r["plan_hash_id"] = plan.hash_id
+                if r["from"] == participant_name:
+                    r["from"] = f"You ({r['from']})"
+                    user_reimbursements.append(r)
+                elif r["to"] == participant_name:
+                    r["to"] = f"You ({r['to']})"
+                    user_reimbursements.append(r)
+    # Each position carries its per-plan breakdown, shown on demand in the page
+    net_reimbursements = net_positions(user_id) if net_mode else None
+    return render_template(
+        "index.html",
+        plans=user_plans,
+        reimbursments=user_reimbursements,
+        net_reimbursements=net_reimbursements,
+    )
 
 
 def landing():
@@ -75,10 +74,17 @@ def create_app():
 
     PrometheusMetrics(app)
 
+    # Behind nginx remote_addr is the proxy; per-IP rate limits need the client
+    if app.config.get("PROXY_FIX_X_FOR", 0) > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
     _init_extensions(app)
     _register_blueprints(app)
     _register_context_processors(app)
     _configure_csp(app)
+    register_commands(app)
+    app.teardown_request(record_user_lookups)
+    start_guest_reaper(app)
 
     # Register top-level views
     app.add_url_rule("/", "index", index)
@@ -115,12 +121,25 @@ def _register_context_processors(app: Flask):
     @app.context_processor
     def inject_current_user():
         # Provide minimal current user info to templates to support UI (guest timer)
-        username = session.get("username")
-        if not username:
+        if not session.get("username"):
             return {}
+        if session.get("uid") is not None:
+            # Everything shown here is carried by the session claims
+            guest_exp = session.get("guest_exp")
+            return {
+                "current_user_info": {
+                    "username": session["username"],
+                    "is_guest": bool(session.get("is_guest")),
+                    "guest_expires_at": (
+                        datetime.fromtimestamp(guest_exp, timezone.utc).isoformat()
+                        if session.get("is_guest") and guest_exp is not None
+                        else None
+                    ),
+                }
+            }
         user = None
         try:
-            user = User.query.filter_by(username=username).first()
+            user = get_current_user()
         except Exception:
             return {}
         if not user:
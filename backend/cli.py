@@ -0,0 +1,93 @@
+import click
+from flask import Flask, current_app
+from backend.models import db, Plan
+from backend.utils.expense_import import (
+    IMPORT_FORMATS,
+    ExpenseImportError,
+    import_expenses,
+    iter_csv_rows,
+    iter_xlsx_rows,
+)
+from backend.utils.guest_capacity import get_guest_capacity, set_guest_capacity
+from backend.utils.guest_reaper import reap_expired_guests
+from backend.utils.ledger import rebuild_plan_ledger
+from backend.utils.plan_cache import bump_plan_revision
+from backend.utils.rollups import rebuild_plan_rollups
+
+
+@click.command("rebuild-ledger")
+@click.option("--plan", "hash_id", default=None, help="Only rebuild the plan with this hash id.")
+def rebuild_ledger_command(hash_id):
+    """Re-derive plan balances and daily spending rollups from raw expense rows."""
+    query = db.session.query(Plan.id, Plan.hash_id).order_by(Plan.id)
+    if hash_id:
+        query = query.filter(Plan.hash_id == hash_id)
+    plans = query.all()
+    if hash_id and not plans:
+        raise click.ClickException(f"Plan {hash_id} not found")
+    for plan_id, plan_hash in plans:
+        rebuild_plan_ledger(plan_id)
+        rebuild_plan_rollups(plan_id)
+        # Results memoized or ETagged under the old revision may predate the rebuild
+        bump_plan_revision(plan_id)
+        db.session.commit()
+        click.echo(f"Rebuilt ledger for plan {plan_hash}")
+    click.echo(f"{len(plans)} plan(s) rebuilt.")
+
+
+@click.command("import-expenses")
+@click.argument("hash_id")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--format",
+    "fmt",
+    type=click.Choice(IMPORT_FORMATS),
+    default=None,
+    help="File format (default: from the file extension).",
+)
+@click.option("--batch-size", type=int, default=None, help="Rows validated and inserted per batch.")
+def import_expenses_command(hash_id, path, fmt, batch_size):
+    """Import expenses into a plan from a CSV/XLSX file in the export layout."""
+    plan = Plan.query.filter_by(hash_id=hash_id).first()
+    if not plan:
+        raise click.ClickException(f"Plan {hash_id} not found")
+    fmt = fmt or path.rsplit(".", 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        raise click.ClickException(f"Unknown format {fmt!r}; use --format")
+    batch_size = batch_size or current_app.config.get("IMPORT_BATCH_SIZE", 1000)
+    with open(path, "rb") as fh:
+        rows = iter_csv_rows(fh) if fmt == "csv" else iter_xlsx_rows(fh)
+        try:
+            imported = import_expenses(plan, rows, batch_size)
+        except ExpenseImportError as exc:
+            for error in exc.errors:
+                click.echo(f"row {error['row']}: {error['error']}", err=True)
+            raise click.ClickException(str(exc)) from exc
+    click.echo(f"Imported {imported} expense(s) into plan {hash_id}.")
+
+
+@click.command("reap-guests")
+@click.option("--batch-size", type=int, default=None, help="Guests deleted per batch.")
+@click.option("--max-batches", type=int, default=10, show_default=True)
+def reap_guests_command(batch_size, max_batches):
+    """Delete expired guest users and their data (run from cron)."""
+    batch_size = batch_size or current_app.config.get("GUEST_REAPER_BATCH_SIZE", 100)
+    reaped = reap_expired_guests(batch_size, max_batches)
+    click.echo(f"Deleted {reaped} expired guest(s).")
+
+
+@click.command("guest-capacity")
+@click.argument("capacity", type=click.IntRange(min=0), required=False)
+def guest_capacity_command(capacity):
+    """Show or set how many guest accounts may be active at once."""
+    if capacity is not None:
+        set_guest_capacity(capacity)
+    total, occupied = get_guest_capacity()
+    click.echo(f"Guest capacity: {total} ({occupied} in use).")
+
+
+def register_commands(app: Flask):
+    app.cli.add_command(rebuild_ledger_command)
+    app.cli.add_command(import_expenses_command)
+    app.cli.add_command(reap_guests_command)
+    app.cli.add_command(guest_capacity_command)
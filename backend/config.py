@@ -35,6 +35,81 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_pre_ping": True,
     }
+    # Settle-up search budget: the solver falls back to greedy pairing once it has
+    # examined SETTLEMENT_NODE_BUDGET candidate groups or spent SETTLEMENT_TIME_BUDGET_MS.
+    SETTLEMENT_NODE_BUDGET = int(os.environ.get("SETTLEMENT_NODE_BUDGET", "20000"))
+    SETTLEMENT_TIME_BUDGET_MS = int(os.environ.get("SETTLEMENT_TIME_BUDGET_MS", "50"))
+    # Derived plan results (balances, totals, settlements) memoized per worker,
+    # keyed by plan id and revision
+    PLAN_CACHE_SIZE = int(os.environ.get("PLAN_CACHE_SIZE", "1024"))
+
+    # Upper bound on buckets returned by the spending time-series API; longer
+    # ranges are downsampled to coarser buckets (week, month, year)
+    TIMESERIES_MAX_POINTS = int(os.environ.get("TIMESERIES_MAX_POINTS", "120"))
+
+    # Home page reimbursements: "plan" settles each plan separately, "net" nets the
+    # user's position per counterparty across all plans. Overridable with ?mode=.
+    HOME_REIMBURSEMENTS_MODE = os.environ.get("HOME_REIMBURSEMENTS_MODE", "plan")
+
+    # Sessions carry the user's id, guest expiry and credential version; the
+    # version is re-checked against the database at most this often (seconds)
+    SESSION_VERIFY_INTERVAL = int(os.environ.get("SESSION_VERIFY_INTERVAL", "300"))
+
+    # Expenses per page in the plan's expenses section, and the largest page the
+    # JSON API serves when paginated with ?limit= / ?cursor=
+    EXPENSES_PAGE_SIZE = int(os.environ.get("EXPENSES_PAGE_SIZE", "50"))
+    EXPENSES_PAGE_MAX = int(os.environ.get("EXPENSES_PAGE_MAX", "200"))
+
+    # Rows validated and inserted per batch by the expense import (API and CLI)
+    IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "1000"))
+
+    # Expenses read per chunk (and rows per write) by the streaming exports
+    EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", "1000"))
+
+    # Background exports: files are kept under EXPORT_DIR per plan and revision
+    EXPORT_DIR = os.environ.get("EXPORT_DIR", str(BASE_DIR / "instance" / "exports"))
+    EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))
+
+    # Expired guests are deleted off the request path: by `flask reap-guests`
+    # from cron, or every GUEST_REAPER_INTERVAL seconds by an in-process thread
+    # (0 disables it; a database lease keeps it to one process at a time)
+    GUEST_REAPER_INTERVAL = int(os.environ.get("GUEST_REAPER_INTERVAL", "0"))
+    GUEST_REAPER_BATCH_SIZE = int(os.environ.get("GUEST_REAPER_BATCH_SIZE", "100"))
+
+    # Concurrent guest accounts allowed when the slot pool is first created;
+    # raise it at runtime with `flask guest-capacity <n>`
+    GUEST_CAPACITY = int(os.environ.get("GUEST_CAPACITY", "10"))
+
+    # Password hashing policy as a werkzeug method string with its cost, e.g.
+    # "scrypt:32768:8:1" or "pbkdf2:sha256:600000". Hashes made under another
+    # policy are upgraded on the user's next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    # Verify passwords on a pool of this many threads (0 = in the request
+    # thread); at most PASSWORD_VERIFY_QUEUE more logins wait before being
+    # turned away
+    PASSWORD_VERIFY_WORKERS = int(os.environ.get("PASSWORD_VERIFY_WORKERS", "0"))
+    PASSWORD_VERIFY_QUEUE = int(os.environ.get("PASSWORD_VERIFY_QUEUE", "16"))
+
+    # Number of reverse proxies in front of the app whose X-Forwarded-For entry
+    # is trusted for the client address (nginx.conf sets it; 0 when the app is
+    # reached directly, as clients could otherwise spoof their address)
+    PROXY_FIX_X_FOR = int(os.environ.get("PROXY_FIX_X_FOR", "1"))
+
+    # Login and guest-creation throttling: "memory" (per worker), "sqlite" (a
+    # file shared by the workers of one host, RATE_LIMIT_SQLITE_PATH) or "off".
+    # Limits are attempts per RATE_LIMIT_WINDOW seconds; 0 disables one.
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_SQLITE_PATH = os.environ.get(
+        "RATE_LIMIT_SQLITE_PATH", str(BASE_DIR / "instance" / "ratelimit.db")
+    )
+    RATE_LIMIT_WINDOW = int(os.environ.get("RATE_LIMIT_WINDOW", "60"))
+    RATE_LIMIT_LOGIN_PER_IP = int(os.environ.get("RATE_LIMIT_LOGIN_PER_IP", "30"))
+    RATE_LIMIT_LOGIN_PER_USERNAME = int(os.environ.get("RATE_LIMIT_LOGIN_PER_USERNAME", "10"))
+    RATE_LIMIT_GUEST_PER_IP = int(os.environ.get("RATE_LIMIT_GUEST_PER_IP", "10"))
+
+    # Largest number of operations accepted by the batch expense endpoint
+    EXPENSE_BATCH_MAX = int(os.environ.get("EXPENSE_BATCH_MAX", "500"))
+
     # Content Security Policy defaults - can be overridden via env vars or subclassing
     # Provide common CDNs used by Bootstrap/Chart.js; override in production for tighter policy
     CSP_DEFAULT_SRC = ["'self'"]
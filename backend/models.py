@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from backend.utils.passwords import hash_password, verify_password
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -16,26 +16,31 @@ class User(db.Model):
     # Guest user support
     is_guest = db.Column(db.Boolean, nullable=False, default=False)
     guest_expires_at = db.Column(db.DateTime, nullable=True)
+    # Bumped on credential or profile changes; sessions carrying an older value are revoked
+    credential_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     created_plans = db.relationship("Plan", back_populates="creator")
     participations = db.relationship("PlanParticipant", back_populates="user")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
 
 # --- PLANS ---
 class Plan(db.Model):
     __tablename__ = "plans"
+    __table_args__ = (db.Index("ix_plans_created_by", "created_by"),)
 
     id = db.Column(db.Integer, primary_key=True)
     hash_id = db.Column(db.String(20), unique=True, nullable=False)  # like /5Gsi7kxi
     name = db.Column(db.String(100), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every expense or participant change; derived results are cached per revision
+    revision = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     # Creator (owner of the plan)
     created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -51,6 +56,10 @@ class Plan(db.Model):
 # --- PLAN PARTICIPANTS (association table) ---
 class PlanParticipant(db.Model):
     __tablename__ = "plan_participants"
+    __table_args__ = (
+        db.Index("ix_plan_participants_plan_id_user_id", "plan_id", "user_id"),
+        db.Index("ix_plan_participants_user_id", "user_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
@@ -66,6 +75,11 @@ class PlanParticipant(db.Model):
 # --- EXPENSES ---
 class Expense(db.Model):
     __tablename__ = "expenses"
+    __table_args__ = (
+        db.Index("ix_expenses_plan_id_date", "plan_id", "date"),
+        db.Index("ix_expenses_payer_name", "payer_name"),
+        db.Index("ix_expenses_payer_id", "payer_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(200), nullable=False)
@@ -88,6 +102,10 @@ class Expense(db.Model):
 # --- EXPENSE SHARES (per participant) ---
 class ExpenseShare(db.Model):
     __tablename__ = "expense_shares"
+    __table_args__ = (
+        db.Index("ix_expense_shares_expense_id", "expense_id"),
+        db.Index("ix_expense_shares_name", "name"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     expense_id = db.Column(db.Integer, db.ForeignKey("expenses.id"), nullable=False)
@@ -102,3 +120,51 @@ class ExpenseShare(db.Model):
     # Relationships
     expense = db.relationship("Expense", back_populates="shares")
     participant = db.relationship("PlanParticipant")
+
+
+# --- PLAN BALANCES (running ledger per participant) ---
+class PlanBalance(db.Model):
+    __tablename__ = "plan_balances"
+    __table_args__ = (db.UniqueConstraint("plan_id", "name", name="uq_plan_balances_plan_id_name"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey("plans.id"), nullable=False)
+    name = db.Column(db.String(100), nullable=False)  # Participant name, as stored on shares
+    # Stored in integer cents so incremental updates never accumulate float drift
+    balance_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# --- EXPENSE DAILY ROLLUPS (spending per participant per day) ---
+class ExpenseDailyRollup(db.Model):
+    __tablename__ = "expense_daily_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("plan_id", "day", "name", name="uq_expense_daily_rollups_key"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    plan_id = db.Column(db.Integer, db.ForeignKey("plans.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    name = db.Column(db.String(100), nullable=False)  # Participant name, as stored on shares
+    # Sum of this participant's shares of non-reimbursement expenses that day
+    spent_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    # Sum of non-reimbursement expenses this participant paid that day
+    paid_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# --- SCHEDULER LEASES (which process runs a periodic job) ---
+class SchedulerLease(db.Model):
+    __tablename__ = "scheduler_leases"
+
+    name = db.Column(db.String(50), primary_key=True)
+    holder = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+
+# --- GUEST SLOTS (admission pool; one row per allowed concurrent guest) ---
+class GuestSlot(db.Model):
+    __tablename__ = "guest_slots"
+
+    slot = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Both null while the slot is free; a slot past expires_at is free again
+    user_id = db.Column(db.Integer, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
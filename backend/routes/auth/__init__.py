@@ -2,12 +2,32 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from backend.models import db, User
 from datetime import datetime, timedelta, timezone
 import secrets
-from backend.utils.auth import login_required
+from backend.utils.auth import forget_current_user, get_current_user, login_required, login_user
+from backend.utils.guest_capacity import assign_guest_slot, claim_guest_slot, release_guest_slot
+from backend.utils.passwords import PasswordVerifyBusy, hash_password, needs_rehash
+from backend.utils.rate_limit import get_rate_limiter
 from backend.utils.user import delete_guest_user
+from sqlalchemy.exc import IntegrityError
 
 auth_bp = Blueprint("auth", __name__, template_folder="templates")
 
 
+def _throttled(endpoint, username=None):
+    """Count this attempt; return a 429 response when a limit is exceeded.
+
+    Runs before any database work so that a flood of attempts costs no
+    queries or password hashes.
+    """
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return None
+    retry_after = limiter.check(endpoint, ip=request.remote_addr, username=username)
+    if not retry_after:
+        return None
+    flash("Too many attempts, please try again later", "danger")
+    return render_template("auth/login.html"), 429, {"Retry-After": str(retry_after)}
+
+
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
@@ -15,14 +35,26 @@ def login():
         if not username:
             flash("Username is required", "error")
             return redirect(url_for("auth.login"))
+        throttled = _throttled("login", username.lower())
+        if throttled:
+            return throttled
         password = request.form.get("password")
         user = User.query.filter_by(username=username).first()
         if not user:
             flash("Invalid username or password", "danger")
             return redirect(url_for("auth.login"))
 
-        if user.check_password(password):
-            session["username"] = username
+        try:
+            valid = user.check_password(password)
+        except PasswordVerifyBusy:
+            flash("Too many logins right now, please try again in a moment", "danger")
+            return redirect(url_for("auth.login"))
+        if valid:
+            if needs_rehash(user.password_hash):
+                # Same password under the current hashing policy; sessions stay valid
+                user.set_password(password)
+                db.session.commit()
+            login_user(user)
             flash("Logged in successfully!", "success")
             return redirect(url_for("index"))
         else:
@@ -68,56 +100,54 @@ def register():
 
 @auth_bp.route("/logout", methods=["POST", "GET"])
 def logout():
-    username = session.get("username")
-    user = None
-    if username:
-        user = User.query.filter_by(username=username).first()
+    user = get_current_user()
     # Perform guest cleanup before clearing session
     if user and user.is_guest:
         delete_guest_user(user)
     session.clear()
+    forget_current_user()
     return redirect(url_for("index"))
 
 
 @auth_bp.route("/guestlogin", methods=["GET"])
 def guestlogin():
-    # Prune expired guest users first
+    throttled = _throttled("guestlogin")
+    if throttled:
+        return throttled
+    # A slot frees itself when its guest expires, before the reaper runs
     now = datetime.now(timezone.utc)
-    expired_guests = User.query.filter(User.is_guest.is_(True), User.guest_expires_at < now).all()
-    for g in expired_guests:
-        delete_guest_user(g)
-    if expired_guests:
-        db.session.commit()
-
-    active_guest_count = User.query.filter(
-        User.is_guest.is_(True), User.guest_expires_at > now
-    ).count()
-    if active_guest_count >= 10:
-        flash("Guest capacity reached (10 active). Try again later.", "danger")
+    expires_at = now + timedelta(hours=2)
+    slot = claim_guest_slot(expires_at.replace(tzinfo=None))
+    if slot is None:
+        flash("Guest capacity reached. Try again later.", "danger")
         return redirect(url_for("auth.login"))
 
-    # Generate unique guest username
-    for _ in range(5):  # Try up to 5 times to generate a unique guest username
-        noun = secrets.token_hex(3)
-        candidate = f"guest-{noun}"
-        if not User.query.filter_by(username=candidate).first():
-            username_val = candidate
-            break
+    # Set a random password so auth methods remain consistent; hashed once, not per retry
+    password_hash = hash_password(secrets.token_urlsafe(16))
+    # The unique constraint arbitrates username collisions; retry with a new name
+    for _ in range(5):
+        username_val = f"guest-{secrets.token_hex(3)}"
+        guest = User(
+            username=username_val,
+            email=f"{username_val}@example.invalid",
+            password_hash=password_hash,
+            is_guest=True,
+            guest_expires_at=expires_at,
+        )
+        db.session.add(guest)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        assign_guest_slot(slot, guest.id)
+        db.session.commit()
+        break
     else:
+        release_guest_slot(slot)
         flash("Could not allocate guest username", "danger")
         return redirect(url_for("auth.login"))
-
-    guest = User(
-        username=username_val,
-        email=f"{username_val}@example.invalid",
-        is_guest=True,
-        guest_expires_at=now + timedelta(hours=2),
-    )
-    # Set a random password so auth methods remain consistent
-    guest.set_password(secrets.token_urlsafe(16))
-    db.session.add(guest)
-    db.session.commit()
-    session["username"] = guest.username
+    login_user(guest)
     flash("Guest login successful. Account expires in 2 hours.", "success")
     return redirect(url_for("index"))
 
@@ -125,16 +155,14 @@ def guestlogin():
 @auth_bp.route("/profile", methods=["GET"])
 @login_required
 def profile():
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
+    user = get_current_user()
     return render_template("profile.html", user=user)
 
 
 @auth_bp.route("/profile/update", methods=["POST"])
 @login_required
 def profile_update():
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
+    user = get_current_user()
 
     new_username = (request.form.get("username") or "").strip()
     new_email = (request.form.get("email") or "").strip()
@@ -152,9 +180,11 @@ def profile_update():
 
     user.username = new_username
     user.email = new_email
+    # Sessions still carrying the old identity are revoked on their next check
+    user.credential_version += 1
     db.session.commit()
-    # update session username if changed
-    session["username"] = new_username
+    # refresh this session's claims (username may have changed)
+    login_user(user)
     flash("Profile updated", "success")
     return redirect(url_for("auth.profile"))
 
@@ -162,8 +192,7 @@ def profile_update():
 @auth_bp.route("/change-password", methods=["GET", "POST"])
 @login_required
 def change_password():
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
+    user = get_current_user()
     if user.is_guest:
         flash("Guest users cannot change password", "danger")
         return redirect(url_for("auth.profile"))
@@ -182,11 +211,19 @@ def change_password():
     if new_password != confirm_password:
         flash("New passwords do not match", "danger")
         return redirect(url_for("auth.profile"))
-    if not user.check_password(old_password):
+    try:
+        valid = user.check_password(old_password)
+    except PasswordVerifyBusy:
+        flash("Too many logins right now, please try again in a moment", "danger")
+        return redirect(url_for("auth.profile"))
+    if not valid:
         flash("Current password is incorrect", "danger")
         return redirect(url_for("auth.profile"))
 
     user.set_password(new_password)
+    # Revoke other sessions; this one is refreshed with the new version
+    user.credential_version += 1
     db.session.commit()
+    login_user(user)
     flash("Password changed successfully", "success")
     return redirect(url_for("auth.profile"))
@@ -1,15 +1,56 @@
-from flask import Blueprint, Response, jsonify, request, render_template, session, send_file
-from backend.utils.auth import login_required
-from backend.models import db, User, Plan, PlanParticipant, Expense, ExpenseShare
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    render_template,
+    send_file,
+    stream_with_context,
+    url_for,
+)
+from backend.utils.auth import get_current_user, get_current_user_id, login_required
+from backend.models import db, Plan, PlanParticipant, Expense, ExpenseShare
+from backend.utils.expenses import create_expense, delete_expense, update_expense
+from backend.utils.ledger import DerivedChanges, get_plan_balances, invalidate_plan_derived
+from backend.utils.rollups import BUCKETS, choose_bucket, spending_timeseries
+from backend.utils.netting import net_positions
+from backend.utils.expense_import import (
+    IMPORT_FORMATS,
+    ExpenseImportError,
+    import_expenses,
+    iter_csv_rows,
+    iter_xlsx_rows,
+)
+from backend.utils.export_jobs import get_export_jobs
+from backend.utils.membership import get_participation
+from backend.utils.plan_cache import bump_plan_revision, memoize_plan, plan_etag
+from backend.utils.settlement import settle_with_app_budget
+from backend.utils.stats import aggregate_plan_totals, compute_plan_totals, from_cents, to_cents
 from .helpers import (
     validate_participant_name_list,
     validate_participants_payload,
     apply_participants_updates,
-    build_plan_xlsx_stream,
-    build_plan_csv,
+    write_plan_xlsx,
+    iter_plan_csv,
+    write_plan_csv,
+    write_plan_arrow,
+    write_plan_parquet,
+    write_expenses_columnar,
+    COLUMNAR_EXPORTS_AVAILABLE,
+    COLUMNAR_FORMATS,
+    decode_expense_cursor,
+    expense_page,
+    list_user_plans,
+    PLAN_SORT_FIELDS,
 )
+from sqlalchemy.orm import selectinload
+import csv
 import secrets
-from datetime import datetime
+import tempfile
+import zipfile
+from functools import partial
+from datetime import date, datetime, timedelta
 
 
 def generate_hash_id(length=8):
@@ -36,37 +77,38 @@ def get_plans():
 @plans_bp.route("/api/plans", methods=["GET"])
 @login_required
 def get_plans_api():
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = get_current_user_id()
+    if user_id is None:
         return jsonify({"error": "User not found"}), 404
-    user_plans = []
-    for participation in user.participations:
-        plan = db.session.get(Plan, participation.plan_id)
-        if plan:
-            participant = PlanParticipant.query.filter_by(plan_id=plan.id).all()
-            expenses = Expense.query.filter_by(plan_id=plan.id).all()
-            user_plans.append(
-                {
-                    "id": plan.id,
-                    "name": plan.name,
-                    "hash_id": plan.hash_id,
-                    "created_at": plan.created_at.isoformat(),
-                    "participants": [p.name for p in participant],
-                    "total_expenses": sum(
-                        e.amount for e in expenses if e.description != "Reimbursement"
-                    ),
-                }
-            )
+    # Optional server-side ordering: ?sort=created_at|name|total_expenses&order=asc|desc&limit=N
+    sort = request.args.get("sort")
+    if sort is not None and sort not in PLAN_SORT_FIELDS:
+        return jsonify({"error": f"sort must be one of {', '.join(PLAN_SORT_FIELDS)}"}), 400
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    user_plans = list_user_plans(
+        user_id, sort=sort, descending=request.args.get("order") == "desc", limit=limit
+    )
     return jsonify(user_plans)
 
 
+# Net position against every counterparty across all the user's plans,
+# with the per-plan breakdown the home page loads on demand
+@plans_bp.route("/api/netting", methods=["GET"])
+@login_required
+def get_netting_api():
+    user_id = get_current_user_id()
+    if user_id is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify(net_positions(user_id))
+
+
 # Add a new plan
 @plans_bp.route("/api/plans", methods=["POST"])
 @login_required
 def add_plan():
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
+    user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
@@ -86,7 +128,7 @@ def add_plan():
         user_id=user.id,
         plan_id=plan.id,
         role="owner",
-        name=participants[0] if participants else username,
+        name=participants[0] if participants else user.username,
     )
     db.session.add(participant)
     # Add other participants
@@ -105,16 +147,15 @@ def add_plan():
 @plans_bp.route("/api/plans/<plan_id>", methods=["GET"])
 @login_required
 def get_plan(plan_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = get_current_user_id()
+    if user_id is None:
         return jsonify({"error": "User not found"}), 404
-    plan = Plan.query.filter_by(hash_id=plan_id).first()
-    if not plan:
-        return jsonify({"error": "Plan not found"}), 404
-    participant = PlanParticipant.query.filter_by(plan_id=plan.id, user_id=user.id).first()
+    participant = get_participation(user_id, plan_id)
     if not participant:
+        if not Plan.query.filter_by(hash_id=plan_id).first():
+            return jsonify({"error": "Plan not found"}), 404
         return jsonify({"error": "You are not a participant of this plan"}), 403
+    plan = participant.plan
     participants = []
     for p in PlanParticipant.query.filter_by(plan_id=plan.id).all():
         participants.append({"id": p.id, "name": p.name, "user_id": p.user_id, "role": p.role})
@@ -125,7 +166,7 @@ def get_plan(plan_id):
         "hash_id": plan.hash_id,
         "created_at": plan.created_at.isoformat(),
         "participants": participants,
-        "current_user_id": user.id,
+        "current_user_id": user_id,
     }
     return jsonify(plan_data), 200
 
@@ -134,16 +175,15 @@ def get_plan(plan_id):
 @plans_bp.route("/api/plans/<plan_id>", methods=["PUT"])
 @login_required
 def modify_plan(plan_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = get_current_user_id()
+    if user_id is None:
         return jsonify({"error": "User not found"}), 404
-    plan = Plan.query.filter_by(hash_id=plan_id).first()
-    if not plan:
-        return jsonify({"error": "Plan not found"}), 404
-    participant = PlanParticipant.query.filter_by(plan_id=plan.id, user_id=user.id).first()
+    participant = get_participation(user_id, plan_id)
     if not participant:
+        if not Plan.query.filter_by(hash_id=plan_id).first():
+            return jsonify({"error": "Plan not found"}), 404
         return jsonify({"error": "You are not a participant of this plan"}), 403
+    plan = participant.plan
     data = request.get_json()
     plan.name = data.get("name", plan.name)
 
@@ -157,6 +197,7 @@ def modify_plan(plan_id):
             return jsonify({"error": msg}), 400
         apply_participants_updates(plan, participants_data)
 
+    bump_plan_revision(plan.id)
     db.session.commit()
     return jsonify({"message": f"Plan {plan.name} updated."}), 200
 
@@ -165,18 +206,18 @@ def modify_plan(plan_id):
 @plans_bp.route("/api/plans/<plan_id>", methods=["DELETE"])
 @login_required
 def delete_plan(plan_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
+    user_id = get_current_user_id()
+    if user_id is None:
         return jsonify({"error": "User not found"}), 404
-    plan = Plan.query.filter_by(hash_id=plan_id).first()
-    if not plan:
-        return jsonify({"error": "Plan not found"}), 404
-    participant = PlanParticipant.query.filter_by(plan_id=plan.id, user_id=user.id).first()
+    participant = get_participation(user_id, plan_id)
     if not participant:
+        if not Plan.query.filter_by(hash_id=plan_id).first():
+            return jsonify({"error": "Plan not found"}), 404
         return jsonify({"error": "You do not have permission to delete this plan"}), 403
+    plan = participant.plan
     # Remove user_id from participant to mark as left
     participant.user_id = None
+    bump_plan_revision(plan.id)
     # If user is owner, set next participant as owner
     if participant.role == "owner":
         next_participant = (
@@ -193,6 +234,7 @@ def delete_plan(plan_id):
                 ExpenseShare.expense_id.in_(db.session.query(Expense.id).filter_by(plan_id=plan.id))
             ).delete(synchronize_session=False)
             Expense.query.filter_by(plan_id=plan.id).delete(synchronize_session=False)
+            invalidate_plan_derived([plan.id])
             PlanParticipant.query.filter_by(plan_id=plan.id).delete(synchronize_session=False)
             db.session.delete(plan)
     db.session.commit()
@@ -203,8 +245,7 @@ def delete_plan(plan_id):
 @plans_bp.route("/api/plans/<plan_id>/join", methods=["GET", "POST"])
 @login_required
 def join_plan(plan_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
+    user = get_current_user()
     if not user:
         return jsonify({"error": "User not found"}), 404
     plan = Plan.query.filter_by(hash_id=plan_id).first()
@@ -223,7 +264,7 @@ def join_plan(plan_id):
         if existing_participant:
             return jsonify({"error": "You are already a participant of this plan."}), 400
         # Add user as participant
-        name = request.json.get("participant_name", username)
+        name = request.json.get("participant_name", user.username)
         update_participant = PlanParticipant.query.filter_by(
             plan_id=plan.id, name=name, user_id=None
         ).first()
@@ -231,6 +272,7 @@ def join_plan(plan_id):
             update_participant.user_id = user.id
         else:
             return jsonify({"error": "No available slot with that name to join."}), 400
+        bump_plan_revision(plan.id)
         db.session.commit()
         return jsonify({"message": f"You have joined the plan '{plan.name}'."}), 200
 
@@ -239,258 +281,532 @@ def join_plan(plan_id):
 @plans_bp.route("/<hash_id>", methods=["GET"])
 @login_required
 def view_plan(hash_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            return render_template("plans/view_plan.html", plan=plan.plan)
-    return jsonify({"error": "Plan not found"}), 404
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    return render_template("plans/view_plan.html", plan=participation.plan)
 
 
-# Export plan expenses as CSV
+# Export plan expenses as CSV, streamed chunk by chunk
 @plans_bp.route("/<hash_id>/export.csv", methods=["GET"])
 @login_required
 def export_plan_csv(hash_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 1000)
+    headers = {
+        "Content-Type": "text/csv; charset=utf-8",
+        "Content-Disposition": f"attachment; filename=plan_{plan.name}.csv",
+    }
+    return Response(stream_with_context(iter_plan_csv(plan, chunk_size)), headers=headers)
 
-    for participation in user.participations:
-        if participation.plan.hash_id == hash_id:
-            plan = participation.plan
-            expenses = Expense.query.filter_by(plan_id=plan.id).order_by(Expense.date).all()
 
-            # Build CSV using helper
-            csv_content = build_plan_csv(plan, expenses)
-            headers = {
-                "Content-Type": "text/csv; charset=utf-8",
-                "Content-Disposition": f"attachment; filename=plan_{plan.name}.csv",
-            }
-            return Response(csv_content, headers=headers)
+# Export plan expenses as XLSX, spooled to a temporary file
+@plans_bp.route("/<hash_id>/export.xlsx", methods=["GET"])
+@login_required
+def export_plan_xlsx(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 1000)
+
+    # Closed (and so deleted) by send_file once the response is sent
+    output = tempfile.TemporaryFile()
+    write_plan_xlsx(plan, output, chunk_size)
+    output.seek(0)
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name=f"plan_{plan.name}.xlsx",
+        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
 
-    return jsonify({"error": "Plan not found"}), 404
+def _send_columnar_export(plan_ids, fmt, download_name):
+    if not COLUMNAR_EXPORTS_AVAILABLE:
+        return jsonify({"error": f"{fmt} export requires pyarrow"}), 501
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 1000)
+    # Closed (and so deleted) by send_file once the response is sent
+    output = tempfile.TemporaryFile()
+    write_expenses_columnar(plan_ids, output, fmt, chunk_size)
+    output.seek(0)
+    return send_file(
+        output,
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=EXPORT_MIMETYPES[fmt],
+    )
 
 
-# Export plan expenses as XLSX
-@plans_bp.route("/<hash_id>/export.xlsx", methods=["GET"])
+# Export plan expenses in long format (one row per share) as Parquet or Arrow
+@plans_bp.route(f"/<hash_id>/export.<any({', '.join(COLUMNAR_FORMATS)}):fmt>", methods=["GET"])
 @login_required
-def export_plan_xlsx(hash_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+def export_plan_columnar(hash_id, fmt):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+    return _send_columnar_export([plan.id], fmt, f"plan_{plan.name}.{fmt}")
+
+
+# The same long-format export over every plan the user participates in
+@plans_bp.route(f"/export.<any({', '.join(COLUMNAR_FORMATS)}):fmt>", methods=["GET"])
+@login_required
+def export_user_plans_columnar(fmt):
+    plan_ids = [
+        plan_id
+        for (plan_id,) in db.session.query(PlanParticipant.plan_id).filter_by(
+            user_id=get_current_user_id()
+        )
+    ]
+    return _send_columnar_export(plan_ids, fmt, f"plans.{fmt}")
+
+
+EXPORT_WRITERS = {"csv": write_plan_csv, "xlsx": write_plan_xlsx}
+EXPORT_MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+if COLUMNAR_EXPORTS_AVAILABLE:
+    EXPORT_WRITERS.update(parquet=write_plan_parquet, arrow=write_plan_arrow)
+
+
+def _export_job_json(hash_id, job_id, state):
+    body = {
+        "job_id": job_id,
+        "status": state["status"],
+        "done": state["done"],
+        "total": state["total"],
+        "status_url": url_for("plans.export_job_status", hash_id=hash_id, job_id=job_id),
+    }
+    if state["status"] == "done":
+        body["download_url"] = url_for("plans.download_export_job", hash_id=hash_id, job_id=job_id)
+    if state.get("error"):
+        body["error"] = state["error"]
+    return body
 
-    for participation in user.participations:
-        if participation.plan.hash_id == hash_id:
-            plan = participation.plan
-            expenses = Expense.query.filter_by(plan_id=plan.id).order_by(Expense.date).all()
-
-            output = build_plan_xlsx_stream(plan, expenses)
-            return send_file(
-                output,
-                as_attachment=True,
-                download_name=f"plan_{plan.name}.xlsx",
-                mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            )
-    return jsonify({"error": "Plan not found"}), 404
+
+# Start a background export of the plan; poll the returned status_url. A file
+# already exported at the current plan revision is reused without a new job.
+@plans_bp.route("/<hash_id>/exports", methods=["POST"])
+@login_required
+def start_export_job(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    data = request.get_json(silent=True) or request.form
+    fmt = (data.get("format") or "csv").lower()
+    if fmt not in EXPORT_WRITERS:
+        return jsonify({"error": f"Format must be one of {', '.join(EXPORT_WRITERS)}"}), 400
+    plan = participation.plan
+    chunk_size = current_app.config.get("EXPORT_CHUNK_SIZE", 1000)
+    writer = partial(EXPORT_WRITERS[fmt], chunk_size=chunk_size)
+
+    jobs = get_export_jobs()
+    job_id = jobs.submit(plan, fmt, writer)
+    state = jobs.status(plan.id, job_id)
+    return jsonify(_export_job_json(hash_id, job_id, state)), 202
+
+
+@plans_bp.route("/<hash_id>/exports/<job_id>", methods=["GET"])
+@login_required
+def export_job_status(hash_id, job_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    state = get_export_jobs().status(participation.plan_id, job_id)
+    if not state:
+        return jsonify({"error": "Export not found"}), 404
+    return jsonify(_export_job_json(hash_id, job_id, state)), 200
+
+
+@plans_bp.route("/<hash_id>/exports/<job_id>/download", methods=["GET"])
+@login_required
+def download_export_job(hash_id, job_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    jobs = get_export_jobs()
+    state = jobs.status(participation.plan_id, job_id)
+    if not state:
+        return jsonify({"error": "Export not found"}), 404
+    if state["status"] != "done":
+        return jsonify({"error": "Export is not finished"}), 409
+    fmt = job_id.rsplit(".", 1)[1]
+    return send_file(
+        jobs.file_path(participation.plan_id, job_id),
+        as_attachment=True,
+        download_name=f"plan_{participation.plan.name}.{fmt}",
+        mimetype=EXPORT_MIMETYPES[fmt],
+    )
+
+
+# Import expenses from a CSV/XLSX file in the export layout
+@plans_bp.route("/<hash_id>/import", methods=["POST"])
+@login_required
+def import_plan_expenses(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"error": "No file uploaded"}), 400
+    fmt = request.form.get("format") or upload.filename.rsplit(".", 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+    rows = iter_csv_rows(upload.stream) if fmt == "csv" else iter_xlsx_rows(upload.stream)
+    try:
+        imported = import_expenses(
+            participation.plan, rows, current_app.config.get("IMPORT_BATCH_SIZE", 1000)
+        )
+    except ExpenseImportError as exc:
+        return jsonify({"error": str(exc), "rows": exc.errors}), 400
+    except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile):
+        return jsonify({"error": f"Could not read the file as {fmt}"}), 400
+    return jsonify({"message": f"Imported {imported} expenses", "imported": imported}), 201
 
 
 @plans_bp.route("/api/plans/<hash_id>/expenses", methods=["GET"])
 @login_required
 def get_plan_expenses_api(hash_id):
-    username = session.get("username")
-    user = User.query.filter_by(username=username).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            plan_expenses = Expense.query.filter_by(plan_id=plan.plan.id).all()
-            expenses_list = []
-            for expense in plan_expenses:
-                participant = ExpenseShare.query.filter_by(expense_id=expense.id).all()
-                expenses_list.append(
-                    {
-                        "id": expense.id,
-                        "name": expense.description,
-                        "amount": expense.amount,
-                        "payer": expense.payer_name,
-                        "participants": [p.name for p in participant],
-                        "amount_details": {p.name: p.amount for p in participant},
-                    }
-                )
-            return jsonify(expenses_list)
-    return jsonify({"error": "Plan not found"}), 404
-
-
-# Render expenses page
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    # Optional keyset pagination: ?limit=N[&cursor=...] returns newest first as
+    # {"expenses": [...], "next_cursor": ...}; without it the full list is returned
+    if "limit" in request.args or "cursor" in request.args:
+        max_limit = current_app.config.get("EXPENSES_PAGE_MAX", 200)
+        limit = request.args.get(
+            "limit", current_app.config.get("EXPENSES_PAGE_SIZE", 50), type=int
+        )
+        if limit is None or limit < 1:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+        try:
+            page, next_cursor = expense_page(
+                participation.plan_id,
+                min(limit, max_limit),
+                request.args.get("cursor"),
+                with_shares=True,
+            )
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        return jsonify(
+            {
+                "expenses": [
+                    {**serialize_expense(expense), "date": expense.date.isoformat()}
+                    for expense in page
+                ],
+                "next_cursor": next_cursor,
+            }
+        )
+    # Shares are loaded for all expenses in one extra query, not one per expense
+    plan_expenses = (
+        Expense.query.options(selectinload(Expense.shares))
+        .filter_by(plan_id=participation.plan_id)
+        .order_by(Expense.id)
+        .all()
+    )
+    return jsonify([serialize_expense(expense) for expense in plan_expenses])
+
+
+def serialize_expense(expense):
+    participant = expense.shares
+    return {
+        "id": expense.id,
+        "name": expense.description,
+        "amount": expense.amount,
+        "payer": expense.payer_name,
+        "participants": [p.name for p in participant],
+        "amount_details": {p.name: p.amount for p in participant},
+    }
+
+
+def group_expenses_by_date(expenses, skip_date=None):
+    """Group an ordered page of expenses under ``dd/mm/YYYY`` headers.
+
+    Returns ``[(date_str, show_header, items)]``. ``skip_date`` is the last
+    date of the previous page, whose header is already on screen.
+    """
+    groups = []
+    for expense in expenses:
+        date_str = expense.date.strftime("%d/%m/%Y")
+        if not groups or groups[-1][0] != date_str:
+            groups.append((date_str, date_str != skip_date, []))
+        groups[-1][2].append(
+            {
+                "id": expense.id,
+                "name": expense.description,
+                "amount": expense.amount,
+                "payer": expense.payer_name,
+            }
+        )
+    return groups
+
+
+# Render expenses page; only the newest page of expenses is rendered, the
+# rest is fetched on demand from the page route below
 @plans_bp.route("/<hash_id>/section/expenses", methods=["GET"])
 @login_required
 def get_plan_expenses(hash_id):
-    user = User.query.filter_by(username=session.get("username")).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            plan_expenses = Expense.query.filter_by(plan_id=plan.plan.id).all()
-            expenses_by_date = {}
-            for expense in plan_expenses:
-                date_str = expense.date.strftime("%d/%m/%Y")
-                if date_str not in expenses_by_date:
-                    expenses_by_date[date_str] = []
-                expenses_by_date[date_str].append(
-                    {
-                        "id": expense.id,
-                        "name": expense.description,
-                        "amount": expense.amount,
-                        "payer": expense.payer_name,
-                    }
-                )
-            participant = PlanParticipant.query.filter_by(plan_id=plan.plan.id).all()
-            participant_names = [p.name for p in participant]
-            sorted_dates = sorted(expenses_by_date.keys(), reverse=True)
-            default_date = datetime.now().date().isoformat()
-            return render_template(
-                "plans/expenses.html",
-                expenses_by_date=expenses_by_date,
-                sorted_dates=sorted_dates,
-                plan=plan.plan,
-                participants=participant_names,
-                default_date=default_date,
-            )
-    return jsonify({"error": "Plan not found"}), 404
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+    page_size = current_app.config.get("EXPENSES_PAGE_SIZE", 50)
+    page, next_cursor = expense_page(plan.id, page_size)
+    participant = PlanParticipant.query.filter_by(plan_id=plan.id).all()
+    participant_names = [p.name for p in participant]
+    default_date = datetime.now().date().isoformat()
+    return render_template(
+        "plans/expenses.html",
+        expense_groups=group_expenses_by_date(page),
+        next_cursor=next_cursor,
+        plan=plan,
+        participants=participant_names,
+        default_date=default_date,
+    )
+
+
+# Next page of the expenses section, as list items appended by the client
+@plans_bp.route("/<hash_id>/section/expenses/page", methods=["GET"])
+@login_required
+def get_plan_expenses_page(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    cursor = request.args.get("cursor", "")
+    try:
+        previous_date, _ = decode_expense_cursor(cursor)
+        page, next_cursor = expense_page(
+            participation.plan_id, current_app.config.get("EXPENSES_PAGE_SIZE", 50), cursor
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    return render_template(
+        "plans/_expense_items.html",
+        expense_groups=group_expenses_by_date(page, previous_date.strftime("%d/%m/%Y")),
+        next_cursor=next_cursor,
+    )
 
 
 # Add expense to a plan
 @plans_bp.route("/<hash_id>/section/expenses", methods=["POST"])
 @login_required
 def add_plan_expense(hash_id):
-    user = User.query.filter_by(username=session.get("username")).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            data = request.get_json()
-            print(f"Received expense data: {data}")
-            date_str = data["date"]
-            try:
-                # If date is in 'YYYY-MM-DD' format
-                date_obj = datetime.fromisoformat(date_str)
-            except Exception:
-                # fallback for other formats, e.g. 'YYYY-MM-DDTHH:MM'
-                date_obj = datetime.strptime(date_str[:10], "%Y-%m-%d")
-
-            new_expense = Expense(
-                description=data["name"],
-                amount=data["amount"],
-                payer_name=data["payer"],
-                date=date_obj,
-                plan_id=plan.plan.id,
-            )
-            db.session.add(new_expense)
-            db.session.flush()  # assign new_expense.id without committing
-            for participant, amount in zip(data["participants"], data["amounts"]):
-                expense_participant = ExpenseShare(
-                    expense_id=new_expense.id, name=participant, amount=amount
-                )
-                db.session.add(expense_participant)
-            db.session.commit()
-            print(f"New expense added to plan {hash_id}: {new_expense}")
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan_id = participation.plan_id
+    data = request.get_json()
+    print(f"Received expense data: {data}")
+    changes = DerivedChanges(plan_id)
+    try:
+        new_expense = create_expense(plan_id, data, changes)
+    except ValueError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc)}), 400
+    changes.apply()
+    bump_plan_revision(plan_id)
+    db.session.commit()
+    print(f"New expense added to plan {hash_id}: {new_expense}")
 
-    return jsonify({"message": "Expense added"}), 201
+    return jsonify({"message": "Expense added", "id": new_expense.id}), 201
 
 
 @plans_bp.route("/<hash_id>/section/expenses/<int:expense_id>", methods=["DELETE"])
 @login_required
 def delete_plan_expense(hash_id, expense_id):
-    user = User.query.filter_by(username=session.get("username")).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            expense = Expense.query.filter_by(id=expense_id, plan_id=plan.plan.id).first()
-            if not expense:
-                return jsonify({"error": "Expense not found"}), 404
-            db.session.delete(expense)
-            db.session.commit()
-            print(f"Expense {expense_id} deleted from plan {hash_id}")
-            return jsonify({"message": "Expense deleted"}), 200
-    return jsonify({"error": "Plan not found"}), 404
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan_id = participation.plan_id
+    expense = Expense.query.filter_by(id=expense_id, plan_id=plan_id).first()
+    if not expense:
+        return jsonify({"error": "Expense not found"}), 404
+    changes = DerivedChanges(plan_id)
+    delete_expense(expense, changes)
+    changes.apply()
+    bump_plan_revision(plan_id)
+    db.session.commit()
+    print(f"Expense {expense_id} deleted from plan {hash_id}")
+    return jsonify({"message": "Expense deleted"}), 200
 
 
 @plans_bp.route("/<hash_id>/section/expenses/<int:expense_id>", methods=["PUT"])
 @login_required
 def update_plan_expense(hash_id, expense_id):
     data = request.get_json()
-    user = User.query.filter_by(username=session.get("username")).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            expense = Expense.query.filter_by(id=expense_id, plan_id=plan.plan.id).first()
-            if not expense:
-                return jsonify({"error": "Expense not found"}), 404
-            # Update expense details
-            expense.description = data.get("name", expense.description)
-            expense.amount = data.get("amount", expense.amount)
-            expense.payer_name = data.get("payer", expense.payer)
-            # Update shares
-            ExpenseShare.query.filter_by(expense_id=expense.id).delete()
-            for participant, amount in zip(data["participants"], data["amounts"]):
-                expense_participant = ExpenseShare(
-                    expense_id=expense.id, name=participant, amount=amount
-                )
-                db.session.add(expense_participant)
-            db.session.commit()
-            print(f"Expense {expense_id} updated in plan {hash_id}")
-            return jsonify({"message": "Expense updated"}), 200
-    return jsonify({"error": "Expense not found"}), 404
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Expense not found"}), 404
+    plan_id = participation.plan_id
+    expense = Expense.query.filter_by(id=expense_id, plan_id=plan_id).first()
+    if not expense:
+        return jsonify({"error": "Expense not found"}), 404
+    changes = DerivedChanges(plan_id)
+    try:
+        update_expense(expense, data, changes)
+    except ValueError as exc:
+        db.session.rollback()
+        return jsonify({"error": str(exc)}), 400
+    changes.apply()
+    bump_plan_revision(plan_id)
+    db.session.commit()
+    print(f"Expense {expense_id} updated in plan {hash_id}")
+    return jsonify({"message": "Expense updated"}), 200
 
 
-@plans_bp.route("/<hash_id>/section/expenses/<int:expense_id>", methods=["GET"])
+# Apply several expense creates/updates/deletes to one plan in a single
+# transaction. Body: {"operations": [{"op": "create", "data": {...}},
+# {"op": "update", "id": 1, "data": {...}}, {"op": "delete", "id": 2}]}.
+# All or nothing: if any operation fails nothing is applied and the response
+# reports which one. Balances, rollups and the revision are updated once.
+@plans_bp.route("/api/plans/<hash_id>/expenses/batch", methods=["POST"])
 @login_required
-def get_plan_expense(hash_id, expense_id):
-    user = User.query.filter_by(username=session.get("username")).first()
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    for plan in user.participations:
-        if plan.plan.hash_id == hash_id:
-            expense = Expense.query.filter_by(id=expense_id, plan_id=plan.plan.id).first()
-            if expense:
-                participant = ExpenseShare.query.filter_by(expense_id=expense.id).all()
-                participant_names = [p.name for p in participant]
-                participant_amounts = [p.amount for p in participant]
-                expense_data = {
-                    "id": expense.id,
-                    "name": expense.description,
-                    "amount": expense.amount,
-                    "date": expense.date.isoformat(),
-                    "payer": expense.payer_name,
-                    "participants": participant_names,
-                    "amounts": participant_amounts,
+def batch_plan_expenses(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    operations = (request.get_json(silent=True) or {}).get("operations")
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    max_operations = current_app.config.get("EXPENSE_BATCH_MAX", 500)
+    if len(operations) > max_operations:
+        return jsonify({"error": f"At most {max_operations} operations per batch"}), 400
+
+    plan_id = participation.plan_id
+    changes = DerivedChanges(plan_id)
+    results = []
+    for index, operation in enumerate(operations):
+        try:
+            results.append(
+                {
+                    "index": index,
+                    "status": "ok",
+                    **apply_expense_operation(plan_id, operation, changes),
                 }
-            return render_template(
-                "/plans/expense.html", expense=expense_data, plan=plan.plan, zip=zip
             )
-    return jsonify({"error": "Expense not found"}), 404
+        except ValueError as exc:
+            db.session.rollback()
+            results.append({"index": index, "status": "error", "error": str(exc)})
+            return jsonify({"error": f"Operation {index} failed", "results": results}), 400
+    changes.apply()
+    bump_plan_revision(plan_id)
+    db.session.commit()
+    return jsonify({"results": results}), 200
+
+
+def apply_expense_operation(plan_id, operation, changes):
+    """Apply one batch operation without committing; raises ValueError if invalid."""
+    if not isinstance(operation, dict):
+        raise ValueError("Operation must be an object")
+    op = operation.get("op")
+    if op == "create":
+        expense = create_expense(plan_id, operation.get("data") or {}, changes)
+        return {"op": op, "id": expense.id}
+    if op not in ("update", "delete"):
+        raise ValueError("op must be create, update or delete")
+    expense_id = operation.get("id")
+    if isinstance(expense_id, bool) or not isinstance(expense_id, int):
+        raise ValueError("id must be an integer")
+    expense = Expense.query.filter_by(id=expense_id, plan_id=plan_id).first()
+    if not expense:
+        raise ValueError(f"Expense {expense_id} not found")
+    if op == "update":
+        update_expense(expense, operation.get("data") or {}, changes)
+    else:
+        delete_expense(expense, changes)
+    return {"op": op, "id": expense.id}
+
+
+@plans_bp.route("/<hash_id>/section/expenses/<int:expense_id>", methods=["GET"])
+@login_required
+def get_plan_expense(hash_id, expense_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Expense not found"}), 404
+    expense = Expense.query.filter_by(id=expense_id, plan_id=participation.plan_id).first()
+    if not expense:
+        return jsonify({"error": "Expense not found"}), 404
+    participant = ExpenseShare.query.filter_by(expense_id=expense.id).all()
+    participant_names = [p.name for p in participant]
+    participant_amounts = [p.amount for p in participant]
+    expense_data = {
+        "id": expense.id,
+        "name": expense.description,
+        "amount": expense.amount,
+        "date": expense.date.isoformat(),
+        "payer": expense.payer_name,
+        "participants": participant_names,
+        "amounts": participant_amounts,
+    }
+    return render_template(
+        "/plans/expense.html", expense=expense_data, plan=participation.plan, zip=zip
+    )
+
+
+# Derived plan results, memoized per plan revision
+
+
+def plan_balances(plan):
+    return memoize_plan(plan, "balances", lambda: get_plan_balances(plan.id))
+
+
+def plan_reimbursements(plan):
+    return memoize_plan(plan, "reimbursements", lambda: settle_with_app_budget(plan_balances(plan)))
+
+
+def plan_totals(plan):
+    """Return ``(total_expense, real_expense)`` for ``plan``."""
+
+    def compute():
+        total_expense, real_expense = aggregate_plan_totals(plan.id)
+        return from_cents(total_expense), from_cents(real_expense)
+
+    return memoize_plan(plan, "totals", compute)
+
+
+def render_plan_section(plan, section, render):
+    """Serve a rendered plan section with an ETag tied to the plan revision.
+
+    Switching tabs in view_plan.js revalidates the section and gets a 304 as
+    long as nothing in the plan changed, without rendering it again.
+    """
+    response = Response()
+    response.set_etag(plan_etag(plan, section))
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code != 304:
+        response.set_data(render())
+    return response
 
 
 # Routes for reimbursements
 
 
 def calculate_reimbursements(balances):
+    """Greedy settle-up, pairing debtors and creditors in order.
+
+    Routes use ``backend.utils.settlement.settle_balances``, which finds
+    fewer transfers; this stays as the simple baseline and fallback.
+    """
     creditors = []
     debtors = []
     reimbursements = []
 
-    # Separate into creditors and debtors
+    # Separate into creditors and debtors, in integer cents so that settled
+    # amounts compare exactly against zero
     for person, balance in balances.items():
-        if balance > 0:
-            creditors.append([person, balance])
-        elif balance < 0:
-            debtors.append([person, -balance])  # store positive debt
+        cents = to_cents(balance)
+        if cents > 0:
+            creditors.append([person, cents])
+        elif cents < 0:
+            debtors.append([person, -cents])  # store positive debt
 
     # Greedy algorithm
     i = j = 0
@@ -499,7 +815,7 @@ def calculate_reimbursements(balances):
         creditor, credit = creditors[j]
 
         amount = min(debt, credit)
-        reimbursements.append({"from": debtor, "to": creditor, "amount": round(amount, 2)})
+        reimbursements.append({"from": debtor, "to": creditor, "amount": amount / 100})
 
         debtors[i][1] -= amount
         creditors[j][1] -= amount
@@ -515,11 +831,18 @@ def calculate_reimbursements(balances):
 @plans_bp.route("/<hash_id>/section/reimbursements", methods=["GET"])
 @login_required
 def get_plan_reimbursements(hash_id):
-    expenses = get_plan_expenses_api(hash_id).get_json()
-    balances = calculate_balance(expenses)
-    reimbursements = calculate_reimbursements(balances)
-    return render_template(
-        "plans/reimbursements.html", hash_id=hash_id, reimbursements=reimbursements
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+    return render_plan_section(
+        plan,
+        "reimbursements",
+        lambda: render_template(
+            "plans/reimbursements.html",
+            hash_id=hash_id,
+            reimbursements=plan_reimbursements(plan),
+        ),
     )
 
 
@@ -527,87 +850,77 @@ def get_plan_reimbursements(hash_id):
 
 
 def calculate_balance(expenses):
-    balances = {}
-    for expense in expenses:
-        payer = expense.get("payer")
-        amount = expense.get("amount", 0) or 0
-        participants = expense.get("participants") or []
-        amount_details = expense.get("amount_details") or {}
+    """Replay a list of expense dicts into ``{name: balance}``.
 
-        # Ensure payer key exists before any arithmetic
-        if payer is not None and payer not in balances:
-            balances[payer] = 0
-
-        for participant in participants:
-            if participant not in balances:
-                balances[participant] = 0
-            share = amount_details.get(participant, 0) or 0
-            if participant == payer:
-                balances[participant] += amount - share
-            else:
-                balances[participant] -= share
-
-        # If payer is outside participants, credit full amount to payer bucket
-        if payer is not None and payer not in participants:
-            balances[payer] += amount
-
-    for k in balances:
-        balances[k] = round(balances[k], 2)
-    return balances
+    Routes read balances from the incrementally maintained ledger
+    (``backend.utils.ledger``); this full replay is kept as the reference
+    implementation the ledger is checked against.
+    """
+    balances, _, _ = compute_plan_totals(expenses)
+    return from_cents(balances)
 
 
 def calculate_expense(expenses):
-    total_expense = {}
-    for expense in expenses:
-        participants = expense["participants"]
-        amount_details = expense["amount_details"]
-        for participant in participants:
-            if participant not in total_expense:
-                total_expense[participant] = 0
-            if expense["name"] == "Reimbursement":
-                continue  # Skip reimbursements in total expense calculation
-            total_expense[participant] += amount_details[participant]
-    for k in total_expense:
-        total_expense[k] = round(total_expense[k], 2)
-    return total_expense
+    _, total_expense, _ = compute_plan_totals(expenses)
+    return from_cents(total_expense)
 
 
 def calculate_real_expense(expenses):
-    real_expense = {}
-    for expense in expenses:
-        payer = expense["payer"]
-        amount = expense["amount"]
-        if payer not in real_expense:
-            real_expense[payer] = 0
-        real_expense[payer] += amount
-        for participant in expense["participants"]:
-            if participant not in real_expense:
-                real_expense[participant] = 0
-        if expense["name"] == "Reimbursement":
-            for participant in expense["participants"]:
-                if participant not in real_expense:
-                    real_expense[participant] = 0
-                real_expense[participant] -= expense["amount_details"][participant]
-    for k in real_expense:
-        real_expense[k] = round(real_expense[k], 2)
-    return real_expense
+    _, _, real_expense = compute_plan_totals(expenses)
+    return from_cents(real_expense)
 
 
 @plans_bp.route("/<hash_id>/section/statistics", methods=["GET"])
 @login_required
 def get_plan_statistics(hash_id):
-    # Placeholder for actual statistics retrieval logic
-    expenses = get_plan_expenses_api(hash_id).get_json()
-    balances = calculate_balance(expenses)
-    total_expense = calculate_expense(expenses)
-    real_expense = calculate_real_expense(expenses)
-    balances = dict(sorted(balances.items()))
-    total_expense = dict(sorted(total_expense.items()))
-    real_expense = dict(sorted(real_expense.items()))
-    return render_template(
-        "plans/statistics.html",
-        hash_id=hash_id,
-        balances=balances,
-        total_expense=total_expense,
-        real_expense=real_expense,
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    plan = participation.plan
+
+    def render():
+        total_expense, real_expense = plan_totals(plan)
+        return render_template(
+            "plans/statistics.html",
+            hash_id=hash_id,
+            balances=dict(sorted(plan_balances(plan).items())),
+            total_expense=dict(sorted(total_expense.items())),
+            real_expense=dict(sorted(real_expense.items())),
+        )
+
+    return render_plan_section(plan, "statistics", render)
+
+
+# Spending over time per participant, served from the daily rollups
+@plans_bp.route("/api/plans/<hash_id>/statistics/timeseries", methods=["GET"])
+@login_required
+def get_plan_timeseries_api(hash_id):
+    participation = get_participation(get_current_user_id(), hash_id)
+    if not participation:
+        return jsonify({"error": "Plan not found"}), 404
+    try:
+        end = date.fromisoformat(request.args["end"]) if "end" in request.args else date.today()
+        start = (
+            date.fromisoformat(request.args["start"])
+            if "start" in request.args
+            else end - timedelta(days=29)
+        )
+    except (ValueError, OverflowError):
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates"}), 400
+    if start > end:
+        return jsonify({"error": "start must not be after end"}), 400
+    bucket = request.args.get("bucket", "auto")
+    if bucket != "auto" and bucket not in BUCKETS:
+        return jsonify({"error": f"bucket must be auto or one of {', '.join(BUCKETS)}"}), 400
+    limit = current_app.config.get("TIMESERIES_MAX_POINTS", 120)
+    max_points = min(max(request.args.get("max_points", limit, type=int), 1), limit)
+    if choose_bucket(start, end, bucket, max_points) is None:
+        return jsonify({"error": f"start to end must span at most {max_points} years"}), 400
+
+    plan = participation.plan
+    series = memoize_plan(
+        plan,
+        f"timeseries:{start}:{end}:{bucket}:{max_points}",
+        lambda: spending_timeseries(plan.id, start, end, bucket, max_points),
     )
+    return jsonify({"start": start.isoformat(), "end": end.isoformat(), **series})
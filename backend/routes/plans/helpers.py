@@ -1,8 +1,24 @@
+import base64
+import csv
+import io
 import openpyxl
-from io import BytesIO
-from backend.models import PlanParticipant, ExpenseShare
+from datetime import datetime
+from itertools import chain, islice
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+try:  # optional: only needed for the Parquet/Arrow exports
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import selectinload
+from backend.models import db, Plan, PlanParticipant, Expense, ExpenseShare
 from typing import List, Tuple, Optional
 
+PLAN_SORT_FIELDS = ("created_at", "name", "total_expenses")
+
 
 def validate_participant_name_list(participants: List[str]) -> Tuple[bool, Optional[str]]:
     """Validate a list of participant names (used by add_plan).
@@ -70,107 +86,347 @@ def apply_participants_updates(plan, participants_data: List[dict]):
             db.session.add(new_pp)
 
 
-def build_plan_xlsx_stream(plan, expenses):
-    """Create an XLSX workbook for a plan and return a BytesIO stream."""
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Plan {plan.name} Expenses"
+def encode_expense_cursor(expense) -> str:
+    """Opaque keyset cursor pointing just after ``expense`` in (date, id) order."""
+    raw = f"{expense.date.isoformat()}|{expense.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
 
-    # Prepare participant columns
-    plan_participants = PlanParticipant.query.filter_by(plan_id=plan.id).all()
-    plan_participant_names = [p.name for p in plan_participants]
 
-    # Header
-    header = ["Date", "Description", "Amount", "Payer"] + plan_participant_names
-    ws.append(header)
+def decode_expense_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Return the ``(date, id)`` encoded in ``cursor``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date_part, id_part = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
 
-    # Rows
-    for exp in expenses:
-        shares = ExpenseShare.query.filter_by(expense_id=exp.id).all()
-        share_map = {s.name: (s.amount if s.amount is not None else 0) for s in shares}
 
-        row = [
-            exp.date.strftime("%Y-%m-%d") if getattr(exp, "date", None) else "",
-            exp.description or "",
-            float(exp.amount or 0),
-            exp.payer_name or "",
-        ]
+def expense_page(plan_id, limit: int, cursor: Optional[str] = None, with_shares: bool = False):
+    """Return ``(expenses, next_cursor)`` for one page of a plan's expenses.
 
-        for pname in plan_participant_names:
-            amt = share_map.get(pname, 0)
-            try:
-                row.append(float(amt))
-            except Exception:
-                row.append(0.0)
+    Newest first, ordered by (date, id) descending and paginated by keyset on
+    those columns, so each page is an index range scan on
+    ``ix_expenses_plan_id_date`` whatever its depth. ``next_cursor`` is None
+    on the last page. Raises ValueError for a malformed ``cursor``.
+    """
+    query = Expense.query.filter(Expense.plan_id == plan_id)
+    if cursor:
+        after_date, after_id = decode_expense_cursor(cursor)
+        query = query.filter(
+            or_(
+                Expense.date < after_date,
+                and_(Expense.date == after_date, Expense.id < after_id),
+            )
+        )
+    if with_shares:
+        query = query.options(selectinload(Expense.shares))
+    rows = query.order_by(Expense.date.desc(), Expense.id.desc()).limit(limit + 1).all()
+    expenses = rows[:limit]
+    next_cursor = encode_expense_cursor(expenses[-1]) if len(rows) > limit else None
+    return expenses, next_cursor
+
+
+def list_user_plans(
+    user_id, sort: Optional[str] = None, descending: bool = False, limit: Optional[int] = None
+) -> List[dict]:
+    """Return the plans a user participates in, as dashboard cards.
+
+    Two queries regardless of the number of plans: one for the plans with
+    their non-reimbursement ``SUM(amount)`` (sorted and limited in SQL), one
+    for the participant names of the selected plans. ``sort`` is one of
+    ``PLAN_SORT_FIELDS``; without it plans come in the order the user joined.
+    """
+    member_plan_ids = db.session.query(PlanParticipant.plan_id).filter(
+        PlanParticipant.user_id == user_id
+    )
+    totals = (
+        db.session.query(Expense.plan_id, func.sum(Expense.amount).label("total"))
+        .filter(Expense.plan_id.in_(member_plan_ids), Expense.description != "Reimbursement")
+        .group_by(Expense.plan_id)
+        .subquery()
+    )
+    total = func.coalesce(totals.c.total, 0)
+    query = (
+        db.session.query(Plan.id, Plan.name, Plan.hash_id, Plan.created_at, total)
+        .join(PlanParticipant, PlanParticipant.plan_id == Plan.id)
+        .outerjoin(totals, totals.c.plan_id == Plan.id)
+        .filter(PlanParticipant.user_id == user_id)
+    )
+    sort_column = {"created_at": Plan.created_at, "name": Plan.name, "total_expenses": total}.get(
+        sort
+    )
+    if sort_column is not None:
+        query = query.order_by(sort_column.desc() if descending else sort_column.asc(), Plan.id)
+    else:
+        query = query.order_by(PlanParticipant.id)
+    if limit:
+        query = query.limit(limit)
+    rows = query.all()
+
+    names = {}
+    if rows:
+        name_rows = (
+            db.session.query(PlanParticipant.plan_id, PlanParticipant.name)
+            .filter(PlanParticipant.plan_id.in_([r[0] for r in rows]))
+            .order_by(PlanParticipant.id)
+        )
+        for plan_id, name in name_rows:
+            names.setdefault(plan_id, []).append(name)
+
+    return [
+        {
+            "id": plan_id,
+            "name": name,
+            "hash_id": hash_id,
+            "created_at": created_at.isoformat(),
+            "participants": names.get(plan_id, []),
+            "total_expenses": float(total_amount or 0),
+        }
+        for plan_id, name, hash_id, created_at, total_amount in rows
+    ]
+
+
+def _expense_chunks(plan_id, chunk_size):
+    """Yield a plan's expenses as lists of at most ``chunk_size`` rows, oldest first.
+
+    Each chunk is one keyset query (``(date, id)`` after the previous
+    chunk's last row) fetched in full, so no cursor stays open while the
+    caller runs other queries on the session. Undated expenses come first,
+    as in an ascending ``ORDER BY date`` on SQLite and MySQL.
+    """
+    columns = select(
+        Expense.id, Expense.date, Expense.description, Expense.amount, Expense.payer_name
+    ).where(Expense.plan_id == plan_id)
+    last = None
+    while True:
+        query = columns.where(Expense.date.is_(None)).order_by(Expense.id)
+        if last is not None:
+            query = query.where(Expense.id > last.id)
+        chunk = db.session.execute(query.limit(chunk_size)).all()
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            break
+        last = chunk[-1]
+    last = None
+    while True:
+        query = columns.where(Expense.date.is_not(None)).order_by(Expense.date, Expense.id)
+        if last is not None:
+            query = query.where(
+                or_(
+                    Expense.date > last.date,
+                    and_(Expense.date == last.date, Expense.id > last.id),
+                )
+            )
+        chunk = db.session.execute(query.limit(chunk_size)).all()
+        if chunk:
+            yield chunk
+        if len(chunk) < chunk_size:
+            break
+        last = chunk[-1]
 
-        ws.append(row)
 
-    # Numeric formatting for amount and shares
-    participant_count = len(plan_participant_names)
-    amount_col_idx = 3
-    last_share_col_idx = amount_col_idx + participant_count
-    for row_cells in ws.iter_rows(min_row=2, min_col=amount_col_idx, max_col=last_share_col_idx):
-        for cell in row_cells:
-            cell.number_format = "0.00"
+def iter_plan_expense_rows(plan_id, chunk_size: int = 1000, progress=None):
+    """Yield ``(expense_row, {participant: share})`` for a plan, oldest first.
 
-    # Adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            try:
-                if cell.value is not None:
-                    max_length = max(max_length, len(str(cell.value)))
-            except Exception:
-                pass
-        ws.column_dimensions[column].width = max_length + 2
-
-    out = BytesIO()
-    wb.save(out)
-    out.seek(0)
-    return out
-
-
-def build_plan_csv(plan, expenses):
-    """Build CSV content for a plan's expenses.
-
-    Returns a string containing CSV data with header:
-    date,description,amount,payer,<participant1>,<participant2>,...
-    Each row contains the expense fields and one column per plan participant
-    with the participant's share for that expense (formatted with two decimals).
+    Expenses are read as plain rows in keyset chunks and the shares of each
+    chunk come from one ``IN`` query, so memory is bounded by ``chunk_size``
+    whatever the plan size. ``progress``, if given, is called with the
+    number of expenses read so far as each chunk is fetched.
     """
-    import csv
-    import io
+    done = 0
+    for chunk in _expense_chunks(plan_id, chunk_size):
+        shares = {}
+        share_rows = db.session.execute(
+            select(ExpenseShare.expense_id, ExpenseShare.name, ExpenseShare.amount).where(
+                ExpenseShare.expense_id.in_([row.id for row in chunk])
+            )
+        )
+        for expense_id, name, amount in share_rows:
+            shares.setdefault(expense_id, {})[name] = amount
+        done += len(chunk)
+        if progress:
+            progress(done)
+        for row in chunk:
+            yield row, shares.get(row.id, {})
 
-    plan_participants = PlanParticipant.query.filter_by(plan_id=plan.id).all()
-    plan_participant_names = [p.name for p in plan_participants]
 
+def iter_plan_csv(plan, chunk_size: int = 1000, progress=None):
+    """Yield a plan's expenses as CSV text, a header line then one chunk of lines at a time.
+
+    Header: date,description,amount,payer,<participant1>,<participant2>,...
+    Each row contains the expense fields and one column per plan participant
+    with the participant's share for that expense (formatted with two decimals).
+    Meant for a streamed response: the header goes out before any expense is
+    read and memory stays flat for any number of expenses. ``progress`` is
+    passed to ``iter_plan_expense_rows``.
+    """
+    plan_participant_names = [
+        name
+        for (name,) in db.session.query(PlanParticipant.name)
+        .filter_by(plan_id=plan.id)
+        .order_by(PlanParticipant.id)
+    ]
     output = io.StringIO()
     writer = csv.writer(output)
 
-    header = ["date", "description", "amount", "payer"] + plan_participant_names
-    writer.writerow(header)
+    def flush():
+        text = output.getvalue()
+        output.seek(0)
+        output.truncate()
+        return text
 
-    for exp in expenses:
-        shares = ExpenseShare.query.filter_by(expense_id=exp.id).all()
-        share_map = {s.name: (s.amount if s.amount is not None else 0) for s in shares}
+    writer.writerow(["date", "description", "amount", "payer"] + plan_participant_names)
+    yield flush()
 
+    for count, (exp, share_map) in enumerate(
+        iter_plan_expense_rows(plan.id, chunk_size, progress), 1
+    ):
         row = [
-            exp.date.isoformat() if getattr(exp, "date", None) else "",
+            exp.date.isoformat() if exp.date else "",
             exp.description or "",
             f"{(exp.amount or 0):.2f}",
             exp.payer_name or "",
         ]
+        row.extend(f"{float(share_map.get(pname) or 0):.2f}" for pname in plan_participant_names)
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield flush()
+    tail = flush()
+    if tail:
+        yield tail
 
-        for pname in plan_participant_names:
-            amt = share_map.get(pname, 0)
-            try:
-                row.append(f"{float(amt):.2f}")
-            except Exception:
-                row.append("0.00")
 
-        writer.writerow(row)
+def write_plan_csv(plan, fileobj, chunk_size: int = 1000, progress=None):
+    """Write ``iter_plan_csv`` output to the binary file ``fileobj`` as UTF-8."""
+    for text in iter_plan_csv(plan, chunk_size, progress):
+        fileobj.write(text.encode("utf-8"))
+
+
+def write_plan_xlsx(plan, fileobj, chunk_size: int = 1000, progress=None, sample_rows: int = 100):
+    """Write a plan's expenses as an XLSX workbook to the binary file ``fileobj``.
+
+    Uses openpyxl's write-only mode, so rows go straight to disk instead of
+    being held as cell objects: memory stays bounded by ``chunk_size`` for
+    any number of expenses. Amount and share cells get their number format
+    as they are written. Column widths have to be set before the first row,
+    so they are estimated from the header and the first ``sample_rows``.
+    ``progress`` is passed to ``iter_plan_expense_rows``.
+    """
+    plan_participant_names = [
+        name
+        for (name,) in db.session.query(PlanParticipant.name)
+        .filter_by(plan_id=plan.id)
+        .order_by(PlanParticipant.id)
+    ]
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(f"Plan {plan.name} Expenses")
+
+    def values(exp, share_map):
+        return [
+            exp.date.strftime("%Y-%m-%d") if exp.date else "",
+            exp.description or "",
+            float(exp.amount or 0),
+            exp.payer_name or "",
+        ] + [float(share_map.get(pname) or 0) for pname in plan_participant_names]
+
+    header = ["Date", "Description", "Amount", "Payer"] + plan_participant_names
+    rows = (
+        values(exp, shares) for exp, shares in iter_plan_expense_rows(plan.id, chunk_size, progress)
+    )
+    sample = list(islice(rows, sample_rows))
+    for idx, column in enumerate(zip(header, *sample), start=1):
+        width = max(
+            len(f"{value:.2f}" if isinstance(value, float) else str(value)) for value in column
+        )
+        ws.column_dimensions[get_column_letter(idx)].width = width + 2
+
+    # Amount and share columns
+    number_columns = [2] + list(range(4, len(header)))
+    ws.append(header)
+    for row in chain(sample, rows):
+        for idx in number_columns:
+            cell = WriteOnlyCell(ws, value=row[idx])
+            cell.number_format = "0.00"
+            row[idx] = cell
+        ws.append(row)
+    wb.save(fileobj)
+
+
+COLUMNAR_FORMATS = ("parquet", "arrow")
+COLUMNAR_EXPORTS_AVAILABLE = pa is not None
+
+
+def expense_share_schema():
+    """Arrow schema of the long-format export: one row per (expense, participant)."""
+    return pa.schema(
+        [
+            ("plan_hash_id", pa.string()),
+            ("plan_name", pa.string()),
+            ("expense_id", pa.int64()),
+            ("date", pa.timestamp("us")),
+            ("description", pa.string()),
+            ("payer", pa.string()),
+            ("amount", pa.float64()),
+            # Null for an expense without shares, so it still appears once
+            ("participant", pa.string()),
+            ("share", pa.float64()),
+        ]
+    )
+
 
-    csv_text = output.getvalue()
-    output.close()
-    return csv_text
+def write_expenses_columnar(plan_ids, fileobj, fmt, chunk_size: int = 1000, progress=None):
+    """Write the expenses of ``plan_ids`` in long format as Parquet or Arrow IPC.
+
+    One row per expense share, typed (timestamps, float64 amounts) and
+    zstd-compressed. Rows come from a single ``yield_per`` query over
+    expenses outer-joined to their shares and each chunk is written as one
+    record batch (one Parquet row group), so memory is bounded by
+    ``chunk_size``. ``progress`` is called with the number of expenses
+    written so far. Requires pyarrow.
+    """
+    schema = expense_share_schema()
+    query = (
+        select(
+            Plan.hash_id,
+            Plan.name,
+            Expense.id,
+            Expense.date,
+            Expense.description,
+            Expense.payer_name,
+            Expense.amount,
+            ExpenseShare.name,
+            ExpenseShare.amount,
+        )
+        .join(Plan, Plan.id == Expense.plan_id)
+        .outerjoin(ExpenseShare, ExpenseShare.expense_id == Expense.id)
+        .where(Expense.plan_id.in_(plan_ids))
+        .order_by(Expense.plan_id, Expense.date, Expense.id, ExpenseShare.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(fileobj, schema, compression="zstd")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        writer = pa.ipc.new_file(fileobj, schema, options=options)
+    expenses, last_id = 0, None
+    try:
+        for chunk in db.session.execute(query).partitions():
+            columns = list(zip(*chunk))
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+            for expense_id in columns[2]:
+                if expense_id != last_id:
+                    expenses, last_id = expenses + 1, expense_id
+            if progress:
+                progress(expenses)
+    finally:
+        writer.close()
+
+
+def write_plan_parquet(plan, fileobj, chunk_size: int = 1000, progress=None):
+    write_expenses_columnar([plan.id], fileobj, "parquet", chunk_size, progress)
+
+
+def write_plan_arrow(plan, fileobj, chunk_size: int = 1000, progress=None):
+    write_expenses_columnar([plan.id], fileobj, "arrow", chunk_size, progress)
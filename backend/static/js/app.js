@@ -89,6 +89,11 @@ function initExpenseClickListener(planId) {
   if (expenseListenerAttached) return; // Prevent multiple listeners
 
   planContent.addEventListener("click", function(e) {
+    const loadMoreButton = e.target.closest(".load-more-expenses");
+    if (loadMoreButton) {
+      loadMoreExpenses(planId, loadMoreButton);
+      return;
+    }
     const expenseDiv = e.target.closest(".expense-item");
     if (expenseDiv) {
       const li = expenseDiv.querySelector("li[data-id]");
@@ -101,6 +106,29 @@ function initExpenseClickListener(planId) {
   expenseListenerAttached = true;
 }
 
+// Fetch the next page of the expenses list and put it in place of the "Load more" item
+function loadMoreExpenses(planId, button) {
+  const item = button.closest(".load-more-item");
+  if (!item || button.disabled) return;
+  button.disabled = true;
+  fetch(`/plans/${planId}/section/expenses/page?cursor=${encodeURIComponent(button.dataset.cursor)}`)
+    .then(res => {
+      if (!res.ok) {
+        throw new Error("Failed to load expenses");
+      }
+      return res.text();
+    })
+    .then(html => {
+      const holder = document.createElement("div");
+      setContentFromHtml(holder, html);
+      item.replaceWith(...Array.from(holder.childNodes));
+    })
+    .catch(err => {
+      button.disabled = false;
+      alert("Error loading expenses: " + err.message);
+    });
+}
+
 function loadExpenseDetails(planId, expenseId) {
   const planContent = document.getElementById("plan-content");
   if (!planContent) return;
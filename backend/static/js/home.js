@@ -0,0 +1,12 @@
+// Home dashboard: show or hide the per-plan breakdown of a cross-plan netting entry
+document.addEventListener("DOMContentLoaded", () => {
+  const list = document.getElementById("net-reimbursements");
+  if (!list) return;
+
+  list.addEventListener("click", (e) => {
+    const btn = e.target.closest(".net-breakdown-btn");
+    if (!btn) return;
+    // The breakdown is rendered with its own entry, so it always matches the counterparty
+    btn.closest("li").querySelector(".net-breakdown").classList.toggle("d-none");
+  });
+});
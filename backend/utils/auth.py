@@ -1,7 +1,105 @@
-from flask import session, redirect, url_for, flash
-from backend.utils.user import delete_guest_user
-from backend.models import User
-from datetime import datetime, timezone
+import time
+from flask import current_app, g, session, redirect, url_for, flash
+from prometheus_client import Histogram
+from backend.models import db, User
+from datetime import timezone
+
+USER_LOOKUPS = Histogram(
+    "mycount_user_lookups_per_request",
+    "Database lookups of the logged-in user per request",
+    buckets=(1, 2, 3, 5),
+)
+
+# Identity claims stored in the signed session cookie next to "username"
+SESSION_CLAIMS = ("uid", "is_guest", "guest_exp", "cred_ver", "verified_at")
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    # Stored datetimes may be naive; treat them as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def login_user(user):
+    """Start (or refresh) the session for ``user`` with its identity claims.
+
+    ``login_required`` authorizes from these claims alone and only reads the
+    database to re-check ``credential_version`` every SESSION_VERIFY_INTERVAL.
+    """
+    session["username"] = user.username
+    session["uid"] = user.id
+    session["is_guest"] = bool(user.is_guest)
+    session["guest_exp"] = _timestamp(user.guest_expires_at)
+    session["cred_ver"] = user.credential_version or 0
+    session["verified_at"] = int(time.time())
+    g.current_user = user
+
+
+def logout_user():
+    """Remove the identity from the session and the request cache."""
+    session.pop("username", None)
+    for claim in SESSION_CLAIMS:
+        session.pop(claim, None)
+    forget_current_user()
+
+
+def get_current_user_id():
+    """Return the logged-in user's id, from the session claims when present."""
+    uid = session.get("uid")
+    if uid is not None:
+        return uid
+    user = get_current_user()
+    return user.id if user else None
+
+
+def get_current_user():
+    """Return the logged-in User for this request, or None.
+
+    The session is resolved at most once per request (by primary key when it
+    carries a ``uid`` claim) and the result kept on ``flask.g``, so the view
+    and the template context processor share one query.
+    """
+    if "current_user" not in g:
+        user = None
+        uid = session.get("uid")
+        username = session.get("username")
+        if uid is not None:
+            user = db.session.get(User, uid)
+            g.user_lookups = g.get("user_lookups", 0) + 1
+        elif username:
+            user = User.query.filter_by(username=username).first()
+            g.user_lookups = g.get("user_lookups", 0) + 1
+        g.current_user = user
+    return g.current_user
+
+
+def forget_current_user():
+    """Drop the cached user, e.g. after it was deleted or the session cleared."""
+    g.pop("current_user", None)
+
+
+def record_user_lookups(exc=None):
+    """Request teardown hook: report the lookup count and reset the cache."""
+    lookups = g.pop("user_lookups", 0)
+    if lookups:
+        USER_LOOKUPS.observe(lookups)
+    g.pop("current_user", None)
+
+
+def _credentials_current() -> bool:
+    """Re-check the session's credential version once the verify interval has passed."""
+    now = int(time.time())
+    interval = current_app.config.get("SESSION_VERIFY_INTERVAL", 300)
+    if now - session.get("verified_at", 0) < interval:
+        return True
+    version = db.session.query(User.credential_version).filter_by(id=session["uid"]).scalar()
+    if version is None or version != session.get("cred_ver"):
+        return False
+    session["verified_at"] = now
+    return True
 
 
 def login_required(f):
@@ -12,27 +110,25 @@ def login_required(f):
         username = session.get("username")
         if not username:
             return redirect(url_for("auth.login"))
-        user = User.query.filter_by(username=username).first()
-        if not user:
-            session.pop("username", None)
-            return redirect(url_for("auth.login"))
+        if session.get("uid") is None:
+            # Session from before identity claims: resolve it once and upgrade
+            user = get_current_user()
+            if not user:
+                logout_user()
+                return redirect(url_for("auth.login"))
+            login_user(user)
 
-        # Normalize and compare datetimes safely (handle naive and aware datetimes)
-        def guest_expired(u: User) -> bool:
-            exp = u.guest_expires_at
-            if not exp:
-                return False
-            now = datetime.now(timezone.utc)
-            # If stored datetime is naive, treat it as UTC
-            if exp.tzinfo is None:
-                exp = exp.replace(tzinfo=timezone.utc)
-            return exp <= now
-
-        if user.is_guest and guest_expired(user):
-            delete_guest_user(user)
-            session.pop("username", None)
+        guest_exp = session.get("guest_exp")
+        if session.get("is_guest") and guest_exp is not None and guest_exp <= time.time():
+            # The account itself is deleted later by the guest reaper
+            logout_user()
             flash("Guest session has expired", "danger")
             return redirect(url_for("auth.login"))
+
+        if not _credentials_current():
+            logout_user()
+            flash("Your session has ended, please log in again", "danger")
+            return redirect(url_for("auth.login"))
         return f(*args, **kwargs)
 
     return decorated
@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+
+
+def utcnow_naive():
+    """Current UTC time without tzinfo, as stored in naive DateTime columns.
+
+    Stored naive so comparisons behave the same on every backend.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,198 @@
+import csv
+import io
+import math
+from datetime import date, datetime
+from itertools import islice
+import openpyxl
+from sqlalchemy import insert
+from backend.models import db, Expense, ExpenseShare, PlanParticipant
+from backend.utils.ledger import DerivedChanges
+from backend.utils.plan_cache import bump_plan_revision
+
+IMPORT_FORMATS = ("csv", "xlsx")
+BASE_COLUMNS = ("date", "description", "amount", "payer")
+# Validation errors reported back to the caller before giving up
+MAX_REPORTED_ERRORS = 20
+
+
+class ExpenseImportError(ValueError):
+    """Raised when an import file is rejected; ``errors`` lists ``{"row", "error"}``."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def iter_csv_rows(stream):
+    """Yield rows of a CSV export from a binary or text stream, one at a time."""
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    yield from csv.reader(stream)
+
+
+def iter_xlsx_rows(fileobj):
+    """Yield rows of the first sheet of an XLSX export without loading it whole."""
+    wb = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        for row in wb.worksheets[0].iter_rows(values_only=True):
+            yield ["" if value is None else value for value in row]
+    finally:
+        wb.close()
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _parse_amount(value):
+    amount = float(value if isinstance(value, (int, float)) else (str(value).strip() or 0))
+    if not math.isfinite(amount):
+        raise ValueError
+    return amount
+
+
+def _parse_row(row, share_columns, participants):
+    """Turn one data row into ``(expense fields, [(name, amount)])`` or raise ValueError."""
+    if len(row) < len(BASE_COLUMNS):
+        raise ValueError("missing columns")
+    try:
+        expense_date = _parse_date(row[0])
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid date {row[0]!r}") from None
+    description = str(row[1]).strip()
+    if not description:
+        raise ValueError("description is required")
+    try:
+        amount = _parse_amount(row[2])
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid amount {row[2]!r}") from None
+    payer = str(row[3]).strip()
+    if payer not in participants:
+        raise ValueError(f"payer {payer!r} is not a participant of this plan")
+    shares = []
+    for name, value in zip(share_columns, row[len(BASE_COLUMNS) :]):
+        try:
+            share = _parse_amount(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid share {value!r} for {name}") from None
+        # Exports write 0.00 for participants outside the split
+        if share:
+            shares.append((name, share))
+    fields = {
+        "date": expense_date,
+        "description": description[:200],
+        "amount": amount,
+        "payer_name": payer,
+    }
+    return fields, shares
+
+
+def _read_header(rows, plan):
+    """Consume the header row; return ``(share column names, plan participant names)``."""
+    header = next(rows, None)
+    if not header:
+        raise ExpenseImportError("The file is empty")
+    header = [str(h).strip() for h in header]
+    if [h.lower() for h in header[: len(BASE_COLUMNS)]] != list(BASE_COLUMNS):
+        raise ExpenseImportError(f"The header must start with {', '.join(BASE_COLUMNS)}")
+    participants = {
+        name for (name,) in db.session.query(PlanParticipant.name).filter_by(plan_id=plan.id)
+    }
+    share_columns = header[len(BASE_COLUMNS) :]
+    unknown = [name for name in share_columns if name not in participants]
+    if unknown:
+        raise ExpenseImportError(f"Unknown participants: {', '.join(unknown)}")
+    return share_columns, participants
+
+
+def _parse_batch(batch, first_line, share_columns, participants):
+    """Parse a batch of rows starting at file line ``first_line``; all or nothing."""
+    parsed, errors = [], []
+    for line, row in enumerate(batch, start=first_line):
+        if not any(str(cell).strip() for cell in row):
+            continue
+        try:
+            parsed.append(_parse_row(row, share_columns, participants))
+        except ValueError as exc:
+            errors.append({"row": line, "error": str(exc)})
+    if errors:
+        raise ExpenseImportError(
+            f"{len(errors)} invalid row(s) near row {errors[0]['row']}",
+            errors[:MAX_REPORTED_ERRORS],
+        )
+    return parsed
+
+
+def _insert_batch(plan_id, parsed):
+    """Insert parsed rows: the expenses and then their shares, each as one executemany.
+
+    Expense ids come back through ``INSERT ... RETURNING`` where the dialect
+    supports it for executemany; otherwise the ORM flush fetches them.
+    """
+    expense_rows = [{"plan_id": plan_id, **fields} for fields, _ in parsed]
+    if db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+        statement = insert(Expense.__table__).returning(
+            Expense.__table__.c.id, sort_by_parameter_order=True
+        )
+        ids = db.session.scalars(statement, expense_rows).all()
+    else:
+        expenses = [Expense(**row) for row in expense_rows]
+        db.session.add_all(expenses)
+        db.session.flush()
+        ids = [expense.id for expense in expenses]
+        for expense in expenses:
+            db.session.expunge(expense)
+    share_rows = [
+        {"expense_id": expense_id, "name": name, "amount": amount}
+        for expense_id, (_, shares) in zip(ids, parsed)
+        for name, amount in shares
+    ]
+    if share_rows:
+        db.session.execute(insert(ExpenseShare.__table__), share_rows)
+    return len(ids)
+
+
+def import_expenses(plan, rows, batch_size=1000):
+    """Import expense rows in the export layout into ``plan``; returns the count.
+
+    ``rows`` is an iterable as produced by ``iter_csv_rows``/``iter_xlsx_rows``
+    whose first row is the header ``date, description, amount, payer,
+    <participant>...``. Rows are validated and inserted ``batch_size`` at a
+    time, so memory stays bounded whatever the file size. Everything runs in
+    one transaction: on the first invalid batch it is rolled back and
+    ExpenseImportError is raised with the offending rows.
+
+    On success the summed changes are applied to the plan's ledger and
+    rollups in one pass, the revision is bumped and the transaction
+    committed.
+    """
+    rows = iter(rows)
+    share_columns, participants = _read_header(rows, plan)
+    plan_id = plan.id
+    imported = 0
+    line = 2  # first data row, after the header
+    try:
+        changes = DerivedChanges(plan_id)
+        while batch := list(islice(rows, batch_size)):
+            parsed = _parse_batch(batch, line, share_columns, participants)
+            imported += _insert_batch(plan_id, parsed)
+            for fields, shares in parsed:
+                changes.record_values(
+                    fields["date"],
+                    fields["description"],
+                    fields["payer_name"],
+                    fields["amount"],
+                    shares,
+                )
+            line += len(batch)
+        changes.apply()
+        bump_plan_revision(plan_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return imported
@@ -0,0 +1,107 @@
+import math
+from datetime import datetime
+from backend.models import db, Expense, ExpenseShare
+
+EXPENSE_FIELDS = ("name", "amount", "payer", "date", "participants", "amounts")
+
+
+def parse_expense_date(value) -> datetime:
+    """Parse 'YYYY-MM-DD' or an ISO datetime such as 'YYYY-MM-DDTHH:MM'."""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        try:
+            return datetime.strptime(str(value)[:10], "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Invalid date {value!r}") from None
+
+
+def parse_amount(value, field="amount") -> float:
+    """Return ``value`` (a number or numeric string) as a finite float; raises ValueError."""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{field} must be a number")
+    try:
+        amount = float(value)
+    except ValueError:
+        raise ValueError(f"{field} must be a number") from None
+    if not math.isfinite(amount):
+        raise ValueError(f"{field} must be a finite number")
+    return amount
+
+
+def _text(value, field):
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+
+def _expense_shares(data):
+    participants, amounts = data.get("participants"), data.get("amounts")
+    if not isinstance(participants, list) or not isinstance(amounts, list):
+        raise ValueError("participants and amounts must be lists")
+    return [
+        (_text(name, "participants"), parse_amount(amount, "amounts"))
+        for name, amount in zip(participants, amounts)
+    ]
+
+
+def create_expense(plan_id, data, changes) -> Expense:
+    """Add an expense and its shares from an API payload; raises ValueError if invalid.
+
+    ``data`` holds ``name``, ``amount``, ``payer``, ``date``,
+    ``participants`` and ``amounts``. The change is recorded on ``changes``
+    (a ``DerivedChanges`` for the plan). Nothing is committed and the plan
+    revision is not bumped; the caller does both once.
+    """
+    missing = [field for field in EXPENSE_FIELDS if field not in data]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    # Validated up front: bad values would otherwise only fail at flush, as a 500
+    shares = _expense_shares(data)
+    expense = Expense(
+        description=_text(data["name"], "name"),
+        amount=parse_amount(data["amount"]),
+        payer_name=_text(data["payer"], "payer"),
+        date=parse_expense_date(data["date"]),
+        plan_id=plan_id,
+    )
+    db.session.add(expense)
+    db.session.flush()  # assign expense.id without committing
+    for participant, amount in shares:
+        db.session.add(ExpenseShare(expense_id=expense.id, name=participant, amount=amount))
+    changes.record(expense, shares)
+    return expense
+
+
+def update_expense(expense, data, changes) -> Expense:
+    """Apply an API payload to ``expense``, replacing its shares; see ``create_expense``.
+
+    Fields missing from ``data`` keep their current value; shares are only
+    replaced when ``participants`` and ``amounts`` are given.
+    """
+    new_shares = _expense_shares(data) if "participants" in data or "amounts" in data else None
+    description = _text(data["name"], "name") if "name" in data else expense.description
+    amount = parse_amount(data["amount"]) if "amount" in data else expense.amount
+    payer = _text(data["payer"], "payer") if "payer" in data else expense.payer_name
+    date = parse_expense_date(data["date"]) if "date" in data else expense.date
+    old_shares = ExpenseShare.query.filter_by(expense_id=expense.id).all()
+    # Take the old version of the expense out of the ledger and rollups
+    changes.record(expense, [(s.name, s.amount) for s in old_shares], sign=-1)
+    expense.description = description
+    expense.amount = amount
+    expense.payer_name = payer
+    expense.date = date
+    if new_shares is None:
+        new_shares = [(s.name, s.amount) for s in old_shares]
+    else:
+        ExpenseShare.query.filter_by(expense_id=expense.id).delete()
+        for participant, amount in new_shares:
+            db.session.add(ExpenseShare(expense_id=expense.id, name=participant, amount=amount))
+    changes.record(expense, new_shares)
+    return expense
+
+
+def delete_expense(expense, changes):
+    """Delete ``expense`` and its shares; see ``create_expense``."""
+    changes.record(expense, [(s.name, s.amount) for s in expense.shares], sign=-1)
+    db.session.delete(expense)
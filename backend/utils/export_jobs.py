@@ -0,0 +1,129 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from backend.models import db, Expense, Plan
+
+# Job ids name the exported file: the plan revision it was requested at and the format
+JOB_ID_RE = re.compile(r"^r(\d+)\.([a-z]+)$")
+
+
+class ExportJobs:
+    """Plan exports run on a small thread pool, off the request workers.
+
+    A job is identified by the plan revision and format (``r<revision>.<fmt>``)
+    and its file and state live under ``<root>/<plan_id>/``. Keeping the
+    state on disk lets any worker process answer status polls and downloads,
+    and a finished file is served again for as long as the revision is
+    unchanged; when a newer revision is exported the older files are removed.
+    """
+
+    def __init__(self, app, root, max_workers=2, stale_after=600):
+        self.app = app
+        self.root = root
+        # A queued/running job whose state was not touched for this long is
+        # assumed lost (e.g. its process was restarted) and is resubmitted
+        self.stale_after = stale_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+
+    def file_path(self, plan_id, job_id):
+        return os.path.join(self.root, str(plan_id), job_id)
+
+    def _state_path(self, plan_id, job_id):
+        return self.file_path(plan_id, job_id) + ".json"
+
+    def status(self, plan_id, job_id):
+        """Return the job state dict (``status``, ``done``, ``total``...) or None if unknown."""
+        if not JOB_ID_RE.match(job_id):
+            return None
+        try:
+            with open(self._state_path(plan_id, job_id)) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state["status"] == "done" and not os.path.exists(self.file_path(plan_id, job_id)):
+            return None
+        return state
+
+    def _save_state(self, plan_id, job_id, **state):
+        path = self._state_path(plan_id, job_id)
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({**state, "updated_at": time.time()}, f)
+        os.replace(tmp, path)
+
+    def submit(self, plan, fmt, writer):
+        """Start exporting ``plan`` unless its current revision is done or in progress.
+
+        ``writer(plan, fileobj, progress=...)`` writes the file. Returns the job id.
+        """
+        job_id = f"r{plan.revision or 0}.{fmt}"
+        with self._lock:
+            state = self.status(plan.id, job_id)
+            if state and (
+                state["status"] == "done"
+                or state["status"] in ("queued", "running")
+                and time.time() - state["updated_at"] < self.stale_after
+            ):
+                return job_id
+            os.makedirs(os.path.join(self.root, str(plan.id)), exist_ok=True)
+            total = db.session.query(Expense.id).filter_by(plan_id=plan.id).count()
+            self._save_state(plan.id, job_id, status="queued", done=0, total=total)
+        self._executor.submit(self._run, plan.id, job_id, writer, total)
+        return job_id
+
+    def _run(self, plan_id, job_id, writer, total):
+        with self.app.app_context():
+            path = self.file_path(plan_id, job_id)
+            tmp = f"{path}.{uuid.uuid4().hex}.part"
+
+            def progress(done):
+                self._save_state(plan_id, job_id, status="running", done=done, total=total)
+
+            try:
+                progress(0)
+                plan = db.session.get(Plan, plan_id)
+                with open(tmp, "wb") as fileobj:
+                    writer(plan, fileobj, progress=progress)
+                os.replace(tmp, path)
+                self._save_state(plan_id, job_id, status="done", done=total, total=total)
+                self._remove_older(plan_id, job_id)
+            except Exception as exc:
+                current_app.logger.exception("Export %s of plan %s failed", job_id, plan_id)
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                self._save_state(
+                    plan_id, job_id, status="failed", done=0, total=total, error=str(exc)
+                )
+            finally:
+                db.session.remove()
+
+    def _remove_older(self, plan_id, job_id):
+        """Delete files and states of earlier revisions in the same format."""
+        revision, fmt = JOB_ID_RE.match(job_id).groups()
+        directory = os.path.join(self.root, str(plan_id))
+        for name in os.listdir(directory):
+            match = JOB_ID_RE.match(name.removesuffix(".json"))
+            if match and match.group(2) == fmt and int(match.group(1)) < int(revision):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+def get_export_jobs() -> ExportJobs:
+    """Return this worker's export job runner, creating it on first use."""
+    jobs = current_app.extensions.get("export_jobs")
+    if jobs is None:
+        jobs = ExportJobs(
+            current_app._get_current_object(),
+            current_app.config.get("EXPORT_DIR"),
+            max_workers=current_app.config.get("EXPORT_WORKERS", 2),
+        )
+        current_app.extensions["export_jobs"] = jobs
+    return jobs
@@ -0,0 +1,82 @@
+import random
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from backend.models import db, GuestSlot
+from backend.utils.dates import utcnow_naive
+
+
+def _free(now):
+    return or_(GuestSlot.expires_at.is_(None), GuestSlot.expires_at < now)
+
+
+def _free_slots(now):
+    return [slot for (slot,) in db.session.query(GuestSlot.slot).filter(_free(now))]
+
+
+def set_guest_capacity(capacity):
+    """Resize the slot pool to ``capacity`` slots.
+
+    Growing adds free slots; shrinking drops the highest-numbered slots even
+    if occupied (those guests keep their session, the slot is just not
+    handed out again). Commits.
+    """
+    current = db.session.query(db.func.max(GuestSlot.slot)).scalar() or 0
+    if capacity > current:
+        db.session.add_all(GuestSlot(slot=n) for n in range(current + 1, capacity + 1))
+    else:
+        GuestSlot.query.filter(GuestSlot.slot > capacity).delete(synchronize_session=False)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another process created the slots first
+        db.session.rollback()
+
+
+def get_guest_capacity():
+    """Return ``(capacity, occupied)`` for the slot pool."""
+    now = utcnow_naive()
+    capacity = GuestSlot.query.count()
+    free = GuestSlot.query.filter(_free(now)).count()
+    return capacity, capacity - free
+
+
+def claim_guest_slot(expires_at):
+    """Reserve a guest slot until ``expires_at`` (naive UTC); return its number or None.
+
+    Admission is one indexed ``UPDATE ... WHERE slot = :n AND <free>`` on a
+    slot picked at random among the free ones, so concurrent logins rarely
+    pick the same slot; one that loses the race moves on to another free
+    slot. None means no free slot is left. The pool is created from
+    GUEST_CAPACITY on first use. Commits.
+    """
+    now = utcnow_naive()
+    free = _free_slots(now)
+    if not free and GuestSlot.query.first() is None:
+        set_guest_capacity(current_app.config.get("GUEST_CAPACITY", 10))
+        free = _free_slots(now)
+    while free:
+        slot = free.pop(random.randrange(len(free)))
+        claimed = GuestSlot.query.filter(GuestSlot.slot == slot, _free(now)).update(
+            {"expires_at": expires_at, "user_id": None}, synchronize_session=False
+        )
+        db.session.commit()
+        if claimed:
+            return slot
+        if not free:
+            # Every slot seen was taken meanwhile; look again for freed ones
+            free = _free_slots(now)
+    return None
+
+
+def assign_guest_slot(slot, user_id):
+    """Record the guest holding ``slot`` (in the caller's transaction)."""
+    GuestSlot.query.filter_by(slot=slot).update({"user_id": user_id}, synchronize_session=False)
+
+
+def release_guest_slot(slot):
+    """Give back a claimed slot that ended up unused. Commits."""
+    GuestSlot.query.filter_by(slot=slot).update(
+        {"expires_at": None, "user_id": None}, synchronize_session=False
+    )
+    db.session.commit()
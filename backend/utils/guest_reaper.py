@@ -0,0 +1,121 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.exc import IntegrityError
+from backend.models import db, SchedulerLease, User
+from backend.utils.dates import utcnow_naive
+from backend.utils.user import delete_guest_users
+
+GUESTS_REAPED = Counter("mycount_guests_reaped_total", "Expired guest users deleted by the reaper")
+GUEST_BACKLOG = Gauge(
+    "mycount_expired_guests_backlog", "Expired guest users still waiting to be deleted"
+)
+REAPER_RUN_SECONDS = Histogram(
+    "mycount_guest_reaper_run_seconds",
+    "Duration of one guest reaper run",
+    buckets=(0.05, 0.1, 0.5, 1, 5, 15, 60),
+)
+
+LEASE_NAME = "guest-reaper"
+
+
+def _expired_guests(now):
+    return User.query.filter(User.is_guest.is_(True), User.guest_expires_at < now)
+
+
+def reap_expired_guests(batch_size=100, max_batches=10):
+    """Delete expired guest users, at most ``batch_size * max_batches`` per call.
+
+    Each batch of ``batch_size`` ids is deleted with ``delete_guest_users``
+    and committed, so a large backlog is worked off over several short
+    transactions. Returns the number of guests deleted and updates the
+    backlog and run metrics.
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    reaped = 0
+    for _ in range(max_batches):
+        batch = [
+            user_id
+            for (user_id,) in _expired_guests(now)
+            .with_entities(User.id)
+            .order_by(User.id)
+            .limit(batch_size)
+        ]
+        delete_guest_users(batch)
+        db.session.commit()
+        reaped += len(batch)
+        if len(batch) < batch_size:
+            break
+    GUESTS_REAPED.inc(reaped)
+    GUEST_BACKLOG.set(_expired_guests(now).count())
+    REAPER_RUN_SECONDS.observe(time.perf_counter() - started)
+    return reaped
+
+
+def acquire_lease(name, holder, ttl):
+    """Take or renew the lease ``name`` for ``ttl`` seconds; True if ``holder`` now owns it.
+
+    The conditional UPDATE only succeeds when the lease expired or is already
+    ours, so of several processes racing for it exactly one wins. The row is
+    created on first use; losing that insert race means someone else holds it.
+    """
+    now = utcnow_naive()
+    expires_at = now + timedelta(seconds=ttl)
+    updated = SchedulerLease.query.filter(
+        SchedulerLease.name == name,
+        (SchedulerLease.expires_at < now) | (SchedulerLease.holder == holder),
+    ).update({"holder": holder, "expires_at": expires_at}, synchronize_session=False)
+    if updated:
+        db.session.commit()
+        return True
+    if db.session.get(SchedulerLease, name) is not None:
+        db.session.rollback()
+        return False
+    try:
+        db.session.add(SchedulerLease(name=name, holder=holder, expires_at=expires_at))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def run_guest_reaper(app, holder):
+    """One scheduled run: reap if this process holds the reaper lease."""
+    with app.app_context():
+        try:
+            interval = app.config["GUEST_REAPER_INTERVAL"]
+            # The lease outlives the interval so a slow run is not doubled up
+            if acquire_lease(LEASE_NAME, holder, ttl=interval * 2):
+                reap_expired_guests(app.config.get("GUEST_REAPER_BATCH_SIZE", 100))
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("Guest reaper run failed")
+        finally:
+            db.session.remove()
+
+
+def start_guest_reaper(app):
+    """Start the in-process reaper thread when GUEST_REAPER_INTERVAL is set.
+
+    Every worker process starts one; the database lease makes only one of
+    them reap per interval. Returns the thread, or None when disabled.
+    """
+    interval = app.config.get("GUEST_REAPER_INTERVAL", 0)
+    if interval <= 0:
+        return None
+    holder = f"{socket.gethostname()}:{os.getpid()}"
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            run_guest_reaper(app, holder)
+
+    thread = threading.Thread(target=loop, name="guest-reaper", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,168 @@
+from backend.models import db, Expense, ExpenseShare, ExpenseDailyRollup, PlanBalance
+from backend.utils.rollups import (
+    apply_rollup_deltas,
+    expense_day,
+    expense_rollup_deltas,
+    invalidate_plan_rollups,
+    rebuild_plan_rollups,
+)
+from backend.utils.stats import to_cents, from_cents
+
+
+def expense_balance_deltas(payer, amount, shares) -> dict:
+    """Return the balance change (in cents) an expense applies to each name.
+
+    ``shares`` is an iterable of ``(name, amount)`` pairs. The payer is credited
+    the full amount and every share holder is debited their share, which is the
+    same arithmetic ``calculate_balance`` performs when replaying a plan.
+    """
+    deltas = {}
+    if payer is not None:
+        deltas[payer] = to_cents(amount)
+    for name, share in shares:
+        deltas[name] = deltas.get(name, 0) - to_cents(share)
+    return deltas
+
+
+def apply_balance_deltas(plan_id, deltas, sign=1):
+    """Add ``{name: cents}`` deltas to the plan ledger, e.g. summed over many expenses.
+
+    Balances are updated with ``balance_cents = balance_cents + delta`` so
+    concurrent writers on the same plan do not overwrite each other.
+    """
+    for name, delta in deltas.items():
+        updated = PlanBalance.query.filter_by(plan_id=plan_id, name=name).update(
+            {PlanBalance.balance_cents: PlanBalance.balance_cents + sign * delta},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.session.add(PlanBalance(plan_id=plan_id, name=name, balance_cents=sign * delta))
+            db.session.flush()
+
+
+def rebuild_plan_ledger(plan_id):
+    """Re-derive a plan's ledger rows from its raw Expense/ExpenseShare rows.
+
+    Does not commit. Returns the rebuilt balances as ``{name: cents}``.
+    """
+    shares_by_expense = {}
+    share_rows = (
+        db.session.query(ExpenseShare.expense_id, ExpenseShare.name, ExpenseShare.amount)
+        .join(Expense, Expense.id == ExpenseShare.expense_id)
+        .filter(Expense.plan_id == plan_id)
+        .order_by(ExpenseShare.id)
+    )
+    for expense_id, name, amount in share_rows:
+        shares_by_expense.setdefault(expense_id, []).append((name, amount))
+
+    balances = {}
+    expense_rows = (
+        db.session.query(Expense.id, Expense.payer_name, Expense.amount)
+        .filter(Expense.plan_id == plan_id)
+        .order_by(Expense.id)
+    )
+    for expense_id, payer, amount in expense_rows:
+        deltas = expense_balance_deltas(payer, amount, shares_by_expense.get(expense_id, []))
+        for name, delta in deltas.items():
+            balances[name] = balances.get(name, 0) + delta
+
+    PlanBalance.query.filter_by(plan_id=plan_id).delete(synchronize_session=False)
+    db.session.add_all(
+        PlanBalance(plan_id=plan_id, name=name, balance_cents=cents)
+        for name, cents in balances.items()
+    )
+    db.session.flush()
+    return balances
+
+
+def ensure_plan_ledger(plan_id):
+    """Rebuild a plan's ledger if it has no rows yet.
+
+    Call before changing the plan's raw rows: deltas applied to a plan whose
+    ledger was never built (or was invalidated) would otherwise leave a
+    partial ledger that the lazy rebuild on read never repairs.
+    """
+    if not db.session.query(PlanBalance.id).filter_by(plan_id=plan_id).first():
+        rebuild_plan_ledger(plan_id)
+
+
+def invalidate_plan_ledgers(plan_ids):
+    """Drop ledger rows for the given plans; they are rebuilt on next read."""
+    if plan_ids:
+        PlanBalance.query.filter(PlanBalance.plan_id.in_(plan_ids)).delete(
+            synchronize_session=False
+        )
+
+
+def get_plan_balances(plan_id) -> dict:
+    """Return ``{name: balance}`` for a plan, read from the ledger.
+
+    Plans without ledger rows (created before the ledger existed, or
+    invalidated by a bulk delete) are rebuilt from raw rows first.
+    """
+    rows = (
+        db.session.query(PlanBalance.name, PlanBalance.balance_cents)
+        .filter(PlanBalance.plan_id == plan_id)
+        .order_by(PlanBalance.id)
+        .all()
+    )
+    if not rows:
+        rebuilt = rebuild_plan_ledger(plan_id)
+        db.session.commit()
+        return from_cents(rebuilt)
+    return from_cents(dict(rows))
+
+
+def ensure_plan_derived(plan_id):
+    """Materialize a plan's ledger and rollups if they are missing.
+
+    Extends ``ensure_plan_ledger`` to the daily rollups, which the lazy
+    rebuild on read would otherwise leave partial in the same way.
+    """
+    ensure_plan_ledger(plan_id)
+    if not db.session.query(ExpenseDailyRollup.id).filter_by(plan_id=plan_id).first():
+        rebuild_plan_rollups(plan_id)
+
+
+class DerivedChanges:
+    """Ledger and rollup deltas of one or more expense changes on a plan.
+
+    Create it before touching the plan's raw rows (it materializes missing
+    derived rows first), ``record`` every expense added (``sign=1``) or
+    taken out with its old values (``sign=-1``), then ``apply()`` once: the
+    deltas are summed per name and day and written in a single pass. Runs in
+    the caller's transaction; nothing is committed here.
+    """
+
+    def __init__(self, plan_id):
+        self.plan_id = plan_id
+        self.balances = {}
+        self.rollups = {}
+        ensure_plan_derived(plan_id)
+
+    def record(self, expense, shares, sign=1):
+        """Record an Expense-like object (``date``, ``description``, ``payer_name``, ``amount``)."""
+        self.record_values(
+            expense.date, expense.description, expense.payer_name, expense.amount, shares, sign
+        )
+
+    def record_values(self, expense_date, description, payer, amount, shares, sign=1):
+        shares = list(shares)
+        for name, delta in expense_balance_deltas(payer, amount, shares).items():
+            self.balances[name] = self.balances.get(name, 0) + sign * delta
+        day = expense_day(expense_date)
+        deltas = expense_rollup_deltas(description, payer, amount, shares)
+        for name, (spent, paid) in deltas.items():
+            old_spent, old_paid = self.rollups.get((day, name), (0, 0))
+            self.rollups[(day, name)] = (old_spent + sign * spent, old_paid + sign * paid)
+
+    def apply(self):
+        apply_balance_deltas(self.plan_id, self.balances)
+        apply_rollup_deltas(self.plan_id, self.rollups)
+        self.balances, self.rollups = {}, {}
+
+
+def invalidate_plan_derived(plan_ids):
+    """Drop ledger and rollup rows for the given plans after bulk deletes."""
+    invalidate_plan_ledgers(plan_ids)
+    invalidate_plan_rollups(plan_ids)
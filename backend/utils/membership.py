@@ -0,0 +1,19 @@
+from sqlalchemy.orm import contains_eager
+from backend.models import Plan, PlanParticipant
+
+
+def get_participation(user_id, hash_id):
+    """Return the user's PlanParticipant in plan ``hash_id`` (with ``.plan`` loaded), or None.
+
+    One indexed query on ``plans.hash_id`` and ``(plan_id, user_id)``. It is
+    not cached: the plan row it loads carries the revision that memoized
+    results and ETags are keyed on, so it has to be read fresh anyway.
+    """
+    if user_id is None:
+        return None
+    return (
+        PlanParticipant.query.join(Plan, Plan.id == PlanParticipant.plan_id)
+        .options(contains_eager(PlanParticipant.plan))
+        .filter(Plan.hash_id == hash_id, PlanParticipant.user_id == user_id)
+        .first()
+    )
@@ -0,0 +1,129 @@
+from collections import namedtuple
+from sqlalchemy import and_
+from sqlalchemy.orm import aliased
+from backend.models import db, User, Plan, PlanBalance, PlanParticipant
+from backend.utils.ledger import get_plan_balances
+from backend.utils.plan_cache import memoize_plan
+from backend.utils.settlement import settle_with_app_budget
+from backend.utils.stats import to_cents
+
+# Enough of a plan for memoize_plan, which keys on id and revision
+PlanKey = namedtuple("PlanKey", "id revision")
+
+
+def _ledger_rows(user_id):
+    me = aliased(PlanParticipant)
+    other = aliased(PlanParticipant)
+    return (
+        db.session.query(
+            Plan.id,
+            Plan.hash_id,
+            Plan.name,
+            Plan.revision,
+            me.name,
+            PlanBalance.name,
+            PlanBalance.balance_cents,
+            other.user_id,
+            User.username,
+        )
+        .select_from(me)
+        .join(Plan, Plan.id == me.plan_id)
+        .outerjoin(PlanBalance, PlanBalance.plan_id == me.plan_id)
+        .outerjoin(other, and_(other.plan_id == me.plan_id, other.name == PlanBalance.name))
+        .outerjoin(User, User.id == other.user_id)
+        .filter(me.user_id == user_id)
+        .order_by(Plan.id, PlanBalance.id)
+        .all()
+    )
+
+
+def _plan_transfers(key, balances):
+    # Shares the cache entry of the plan's own reimbursements list
+    return memoize_plan(key, "reimbursements", lambda: settle_with_app_budget(balances))
+
+
+def counterparty_positions(user_id):
+    """Return the user's position against every counterparty, per plan.
+
+    Positions are the transfers involving the user in each plan's settlement,
+    the same memoized transfers the per-plan view lists, so a debt settled
+    through a third person nets out in both views. The ledgers of all the
+    user's plans are read in one query; plans without ledger rows are
+    rebuilt first. Rows are ``(plan_hash_id, plan_name, counterparty name,
+    counterparty user id or None, counterparty username or None, net)`` where
+    a positive ``net`` means the counterparty owes the user.
+    """
+    rows = _ledger_rows(user_id)
+    # Plans without expenses stay empty after the rebuild and need no second read
+    rebuilt = [get_plan_balances(row[0]) for row in rows if row[5] is None]
+    if any(rebuilt):
+        rows = _ledger_rows(user_id)
+
+    plans = {}
+    for plan_id, hash_id, plan_name, revision, my_name, name, cents, other_id, username in rows:
+        plan = plans.setdefault(
+            plan_id,
+            {
+                "key": PlanKey(plan_id, revision),
+                "hash_id": hash_id,
+                "name": plan_name,
+                "me": my_name,
+                "balances": {},
+                "accounts": {},
+            },
+        )
+        if name is None:
+            continue
+        plan["balances"][name] = cents / 100
+        plan["accounts"][name] = (other_id, username)
+
+    positions = []
+    for plan in plans.values():
+        for transfer in _plan_transfers(plan["key"], plan["balances"]):
+            if transfer["to"] == plan["me"]:
+                name, net = transfer["from"], transfer["amount"]
+            elif transfer["from"] == plan["me"]:
+                name, net = transfer["to"], -transfer["amount"]
+            else:
+                continue
+            other_id, username = plan["accounts"].get(name, (None, None))
+            positions.append((plan["hash_id"], plan["name"], name, other_id, username, net))
+    return positions
+
+
+def net_positions(user_id):
+    """Net the user's position against each counterparty across all plans.
+
+    Counterparties linked to an account are netted across every plan they
+    share with the user; unlinked participant names are only meaningful
+    inside their own plan and stay separate. Returns a list of
+    ``{"counterparty", "amount", "plans": [{"hash_id", "name", "amount"}]}``
+    sorted by largest amount first, where a positive ``amount`` means the
+    counterparty owes the user. Settled counterparties are left out.
+    """
+    positions = {}
+    for hash_id, plan_name, name, other_id, other_username, net in counterparty_positions(user_id):
+        if other_id == user_id:
+            continue
+        key = ("user", other_id) if other_id else ("name", hash_id, name)
+        entry = positions.setdefault(
+            key, {"counterparty": other_username or name, "cents": 0, "plans": []}
+        )
+        cents = to_cents(net)
+        entry["cents"] += cents
+        if cents:
+            entry["plans"].append({"hash_id": hash_id, "name": plan_name, "amount": cents / 100})
+
+    settled = []
+    for entry in positions.values():
+        if entry["cents"] == 0:
+            continue
+        settled.append(
+            {
+                "counterparty": entry["counterparty"],
+                "amount": entry.pop("cents") / 100,
+                "plans": sorted(entry["plans"], key=lambda p: p["hash_id"]),
+            }
+        )
+    settled.sort(key=lambda e: (-abs(e["amount"]), e["counterparty"]))
+    return settled
@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = "scrypt"
+
+# Fully spelled-out form of each configured method, e.g. "scrypt" -> "scrypt:32768:8:1"
+_canonical_methods = {}
+
+
+class PasswordVerifyBusy(Exception):
+    """Raised when the verify pool's queue is full; the caller should ask to retry."""
+
+
+def hash_method():
+    """The configured PASSWORD_HASH_METHOD (a werkzeug method string with its cost)."""
+    if not has_app_context():
+        return DEFAULT_METHOD
+    return current_app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+
+
+def _canonical(method):
+    if method not in _canonical_methods:
+        # werkzeug fills in default costs; hashing once reveals the full parameters
+        _canonical_methods[method] = generate_password_hash("", method).split("$", 1)[0]
+    return _canonical_methods[method]
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=hash_method())
+
+
+def needs_rehash(pwhash):
+    """True if ``pwhash`` was made with another algorithm or cost than the current policy."""
+    return pwhash.split("$", 1)[0] != _canonical(hash_method())
+
+
+class VerifyPool:
+    """Bounded pool verifying passwords off the request thread.
+
+    At most ``workers`` hashes run at once and at most ``queue`` more wait;
+    beyond that ``verify`` raises PasswordVerifyBusy instead of piling work
+    onto a CPU-bound worker.
+    """
+
+    def __init__(self, workers, queue):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwverify")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def verify(self, pwhash, password):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordVerifyBusy()
+        try:
+            return self._executor.submit(check_password_hash, pwhash, password).result()
+        finally:
+            self._slots.release()
+
+
+def get_verify_pool():
+    """Return this worker's verify pool, or None when PASSWORD_VERIFY_WORKERS is 0."""
+    workers = current_app.config.get("PASSWORD_VERIFY_WORKERS", 0)
+    if workers <= 0:
+        return None
+    pool = current_app.extensions.get("password_verify_pool")
+    if pool is None:
+        pool = VerifyPool(workers, current_app.config.get("PASSWORD_VERIFY_QUEUE", 16))
+        current_app.extensions["password_verify_pool"] = pool
+    return pool
+
+
+def verify_password(pwhash, password):
+    """Check ``password`` against ``pwhash``, in the verify pool when one is configured.
+
+    Raises PasswordVerifyBusy when the pool is saturated.
+    """
+    pool = get_verify_pool() if has_app_context() else None
+    if pool is None:
+        return check_password_hash(pwhash, password)
+    return pool.verify(pwhash, password)
@@ -0,0 +1,106 @@
+import copy
+import threading
+from collections import OrderedDict
+from flask import current_app
+from prometheus_client import Counter
+from backend.models import Plan
+
+PLAN_CACHE_EVENTS = Counter(
+    "mycount_plan_cache_events_total",
+    "Lookups in the per-worker plan caches",
+    ["cache", "event"],
+)
+
+
+class LRUCache:
+    """Small thread-safe LRU map with hit/miss/eviction counters."""
+
+    def __init__(self, maxsize=1024, name="plan_results"):
+        self.maxsize = maxsize
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                PLAN_CACHE_EVENTS.labels(self.name, "hit").inc()
+                return self._data[key]
+            self.misses += 1
+            PLAN_CACHE_EVENTS.labels(self.name, "miss").inc()
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+                PLAN_CACHE_EVENTS.labels(self.name, "eviction").inc()
+
+    def pop(self, key):
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def get_results_cache() -> LRUCache:
+    """Return this worker's plan results cache, sized from ``PLAN_CACHE_SIZE``."""
+    cache = current_app.extensions.get("plan_results_cache")
+    if cache is None:
+        cache = LRUCache(current_app.config.get("PLAN_CACHE_SIZE", 1024))
+        current_app.extensions["plan_results_cache"] = cache
+    return cache
+
+
+def bump_plan_revision(*plan_ids):
+    """Increment the revision of the given plans in the current transaction.
+
+    Every expense or participant mutation calls this so results memoized
+    under the previous revision are never served again.
+    """
+    if plan_ids:
+        Plan.query.filter(Plan.id.in_(plan_ids)).update(
+            {Plan.revision: Plan.revision + 1}, synchronize_session=False
+        )
+
+
+def memoize_plan(plan, kind, compute):
+    """Return ``compute()`` for ``plan``, memoized under ``(plan.id, plan.revision)``.
+
+    ``kind`` names the derived value ("balances", "reimbursements", ...).
+    Callers get a copy and may mutate it freely.
+    """
+    cache = get_results_cache()
+    key = (plan.id, plan.revision or 0, kind)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    return copy.deepcopy(value)
+
+
+def plan_etag(plan, section):
+    """ETag for a rendered plan section; changes whenever the revision does."""
+    return f"plan-{plan.id}-r{plan.revision or 0}-{section}"
@@ -0,0 +1,157 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app
+from prometheus_client import Counter
+
+RATE_LIMITED = Counter(
+    "mycount_rate_limited_total",
+    "Requests rejected by the rate limiter",
+    ["endpoint", "key"],
+)
+
+
+def _estimate(previous, current, elapsed, window):
+    """Sliding-window count: the previous window weighted by how much of it still overlaps."""
+    return previous * (1 - elapsed / window) + current
+
+
+class MemoryRateLimitStore:
+    """Sliding-window counters in this process; enough for a single worker."""
+
+    def __init__(self, max_keys=100_000):
+        self._windows = {}  # key -> (window number, count in it, count in the one before)
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def hit(self, key, limit, window, now=None):
+        """Count a hit on ``key`` unless it is over ``limit`` per ``window`` seconds.
+
+        Returns 0 when allowed, else the seconds until a retry could succeed.
+        """
+        now = time.time() if now is None else now
+        number, elapsed = divmod(now, window)
+        with self._lock:
+            start, current, previous = self._windows.get(key, (number, 0, 0))
+            if start != number:
+                previous = current if start == number - 1 else 0
+                current = 0
+            if _estimate(previous, current, elapsed, window) >= limit:
+                return max(1, math.ceil(window - elapsed))
+            if len(self._windows) >= self.max_keys and key not in self._windows:
+                self._prune(number)
+            self._windows[key] = (number, current + 1, previous)
+            return 0
+
+    def _prune(self, number):
+        # Keys idle for two windows no longer influence any estimate
+        for key in [k for k, (start, _, _) in self._windows.items() if start < number - 1]:
+            del self._windows[key]
+
+
+class SQLiteRateLimitStore:
+    """Sliding-window counters in a SQLite file shared by the workers of one host.
+
+    Kept apart from the application database so throttled requests never
+    touch it. Each hit is one short IMMEDIATE transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._hits = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL, "
+                "PRIMARY KEY (key, window))"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, window, now=None):
+        """Same contract as ``MemoryRateLimitStore.hit``."""
+        now = time.time() if now is None else now
+        number, elapsed = divmod(now, window)
+        number = int(number)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            counts = dict(
+                conn.execute(
+                    "SELECT window, count FROM rate_limits WHERE key = ? AND window IN (?, ?)",
+                    (key, number, number - 1),
+                )
+            )
+            if (
+                _estimate(counts.get(number - 1, 0), counts.get(number, 0), elapsed, window)
+                >= limit
+            ):
+                return max(1, math.ceil(window - elapsed))
+            conn.execute(
+                "INSERT INTO rate_limits (key, window, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (key, window) DO UPDATE SET count = count + 1",
+                (key, number),
+            )
+            self._hits += 1
+            if self._hits % 1000 == 0:
+                conn.execute("DELETE FROM rate_limits WHERE window < ?", (number - 1,))
+            return 0
+        finally:
+            conn.execute("COMMIT")
+
+
+class RateLimiter:
+    """Applies the configured per-IP and per-username limits to an endpoint."""
+
+    def __init__(self, store, window, limits):
+        self.store = store
+        self.window = window
+        self.limits = limits  # {(endpoint, "ip" | "username"): hits per window}
+
+    def check(self, endpoint, ip=None, username=None):
+        """Count one attempt; return the seconds to wait if it must be rejected, else 0."""
+        for kind, value in (("ip", ip), ("username", username)):
+            limit = self.limits.get((endpoint, kind))
+            if not value or not limit:
+                continue
+            retry_after = self.store.hit(f"{endpoint}:{kind}:{value}", limit, self.window)
+            if retry_after:
+                RATE_LIMITED.labels(endpoint=endpoint, key=kind).inc()
+                return retry_after
+        return 0
+
+
+def get_rate_limiter():
+    """Return this app's rate limiter, or None when RATE_LIMIT_BACKEND is "off"."""
+    backend = current_app.config.get("RATE_LIMIT_BACKEND", "memory")
+    if backend == "off":
+        return None
+    limiter = current_app.extensions.get("rate_limiter")
+    if limiter is None:
+        if backend == "sqlite":
+            store = SQLiteRateLimitStore(current_app.config["RATE_LIMIT_SQLITE_PATH"])
+        else:
+            store = MemoryRateLimitStore()
+        config = current_app.config
+        limiter = RateLimiter(
+            store,
+            config.get("RATE_LIMIT_WINDOW", 60),
+            {
+                ("login", "ip"): config.get("RATE_LIMIT_LOGIN_PER_IP", 30),
+                ("login", "username"): config.get("RATE_LIMIT_LOGIN_PER_USERNAME", 10),
+                ("guestlogin", "ip"): config.get("RATE_LIMIT_GUEST_PER_IP", 10),
+            },
+        )
+        current_app.extensions["rate_limiter"] = limiter
+    return limiter
@@ -0,0 +1,200 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+from backend.models import db, Expense, ExpenseShare, ExpenseDailyRollup
+from backend.utils.stats import REIMBURSEMENT, to_cents
+
+BUCKETS = ("day", "week", "month", "year")
+
+
+def expense_rollup_deltas(description, payer, amount, shares) -> dict:
+    """Return ``{name: (spent_cents, paid_cents)}`` an expense adds to its day.
+
+    Reimbursements only move money between participants, so they are not
+    counted as spending.
+    """
+    if description == REIMBURSEMENT:
+        return {}
+    deltas = {}
+    if payer is not None:
+        deltas[payer] = (0, to_cents(amount))
+    for name, share in shares:
+        spent, paid = deltas.get(name, (0, 0))
+        deltas[name] = (spent + to_cents(share), paid)
+    return deltas
+
+
+def expense_day(value) -> date:
+    """The rollup day of an expense date (today when unset)."""
+    if value is None:
+        return datetime.utcnow().date()
+    return value.date() if isinstance(value, datetime) else value
+
+
+def apply_rollup_deltas(plan_id, deltas, sign=1):
+    """Add ``{(day, name): (spent_cents, paid_cents)}`` deltas to the daily rollups."""
+    for (day, name), (spent, paid) in deltas.items():
+        updated = ExpenseDailyRollup.query.filter_by(plan_id=plan_id, day=day, name=name).update(
+            {
+                ExpenseDailyRollup.spent_cents: ExpenseDailyRollup.spent_cents + sign * spent,
+                ExpenseDailyRollup.paid_cents: ExpenseDailyRollup.paid_cents + sign * paid,
+            },
+            synchronize_session=False,
+        )
+        if not updated:
+            db.session.add(
+                ExpenseDailyRollup(
+                    plan_id=plan_id,
+                    day=day,
+                    name=name,
+                    spent_cents=sign * spent,
+                    paid_cents=sign * paid,
+                )
+            )
+            db.session.flush()
+
+
+def rebuild_plan_rollups(plan_id):
+    """Re-derive a plan's daily rollups from raw Expense/ExpenseShare rows.
+
+    Does not commit. Returns the number of rollup rows written.
+    """
+    totals = {}
+    is_spend = Expense.description != REIMBURSEMENT
+    payer_rows = (
+        db.session.query(Expense.date, Expense.payer_name, Expense.amount)
+        .filter(Expense.plan_id == plan_id, is_spend)
+        .order_by(Expense.id)
+    )
+    for expense_date, payer, amount in payer_rows:
+        key = (expense_day(expense_date), payer)
+        spent, paid = totals.get(key, (0, 0))
+        totals[key] = (spent, paid + to_cents(amount))
+    share_rows = (
+        db.session.query(Expense.date, ExpenseShare.name, ExpenseShare.amount)
+        .join(Expense, Expense.id == ExpenseShare.expense_id)
+        .filter(Expense.plan_id == plan_id, is_spend)
+        .order_by(ExpenseShare.id)
+    )
+    for expense_date, name, amount in share_rows:
+        key = (expense_day(expense_date), name)
+        spent, paid = totals.get(key, (0, 0))
+        totals[key] = (spent + to_cents(amount), paid)
+
+    ExpenseDailyRollup.query.filter_by(plan_id=plan_id).delete(synchronize_session=False)
+    db.session.add_all(
+        ExpenseDailyRollup(plan_id=plan_id, day=day, name=name, spent_cents=s, paid_cents=p)
+        for (day, name), (s, p) in totals.items()
+    )
+    db.session.flush()
+    return len(totals)
+
+
+def invalidate_plan_rollups(plan_ids):
+    """Drop rollup rows for the given plans; they are rebuilt on next read."""
+    if plan_ids:
+        ExpenseDailyRollup.query.filter(ExpenseDailyRollup.plan_id.in_(plan_ids)).delete(
+            synchronize_session=False
+        )
+
+
+def bucket_start(day: date, bucket: str) -> date:
+    """Return the first day of the ``bucket`` ("day", "week", ...) containing ``day``."""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _next_bucket(start: date, bucket: str) -> Optional[date]:
+    """Start of the bucket after ``start``, or None past the end of the calendar."""
+    try:
+        if bucket == "week":
+            return start + timedelta(days=7)
+        if bucket == "month":
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        if bucket == "year":
+            return start.replace(year=start.year + 1)
+        return start + timedelta(days=1)
+    except (OverflowError, ValueError):
+        return None
+
+
+def bucket_labels(start: date, end: date, bucket: str, limit=None):
+    """Return bucket start dates covering ``[start, end]``; stops after ``limit + 1``."""
+    labels = []
+    current = bucket_start(start, bucket)
+    while current is not None and current <= end:
+        labels.append(current)
+        if limit is not None and len(labels) > limit:
+            break
+        current = _next_bucket(current, bucket)
+    return labels
+
+
+def choose_bucket(start: date, end: date, bucket: str, max_points: int) -> Optional[str]:
+    """Coarsen ``bucket`` (or pick one for "auto") until the range fits ``max_points``.
+
+    Returns None when even yearly buckets are more than ``max_points``.
+    """
+    candidates = BUCKETS if bucket == "auto" else BUCKETS[BUCKETS.index(bucket) :]
+    for candidate in candidates:
+        if len(bucket_labels(start, end, candidate, limit=max_points)) <= max_points:
+            return candidate
+    return None
+
+
+def spending_timeseries(plan_id, start: date, end: date, bucket="auto", max_points=120):
+    """Spending and payments per participant over ``[start, end]``, bucketed.
+
+    Reads only the daily rollups in range (never the expenses themselves) and
+    downsamples to at most ``max_points`` buckets by switching to a coarser
+    bucket when needed. Returns ``{"bucket", "labels", "series"}`` where
+    ``series[name]`` holds ``spent`` and ``paid`` lists aligned with ``labels``.
+    Raises ValueError when the range does not fit ``max_points`` yearly buckets.
+    """
+    chosen = choose_bucket(start, end, bucket, max_points)
+    if chosen is None:
+        raise ValueError(f"{start} to {end} spans more than {max_points} years")
+
+    if not db.session.query(ExpenseDailyRollup.id).filter_by(plan_id=plan_id).first():
+        rebuild_plan_rollups(plan_id)
+        db.session.commit()
+
+    bucket = chosen
+    labels = bucket_labels(start, end, bucket)
+    index = {label: i for i, label in enumerate(labels)}
+    series = {}
+    rows = (
+        db.session.query(
+            ExpenseDailyRollup.day,
+            ExpenseDailyRollup.name,
+            ExpenseDailyRollup.spent_cents,
+            ExpenseDailyRollup.paid_cents,
+        )
+        .filter(
+            ExpenseDailyRollup.plan_id == plan_id,
+            ExpenseDailyRollup.day >= start,
+            ExpenseDailyRollup.day <= end,
+        )
+        .order_by(ExpenseDailyRollup.day, ExpenseDailyRollup.id)
+    )
+    for day, name, spent, paid in rows:
+        entry = series.setdefault(name, {"spent": [0] * len(labels), "paid": [0] * len(labels)})
+        i = index[bucket_start(day, bucket)]
+        entry["spent"][i] += spent
+        entry["paid"][i] += paid
+
+    return {
+        "bucket": bucket,
+        "labels": [label.isoformat() for label in labels],
+        "series": {
+            name: {
+                "spent": [cents / 100 for cents in entry["spent"]],
+                "paid": [cents / 100 for cents in entry["paid"]],
+            }
+            for name, entry in series.items()
+        },
+    }
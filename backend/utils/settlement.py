@@ -0,0 +1,113 @@
+import time
+from itertools import combinations
+from flask import current_app
+from backend.utils.stats import to_cents
+
+
+def _greedy_transfers(entries):
+    """Pair debtors with creditors in order. ``entries`` is ``[[name, cents]]``."""
+    debtors = [[name, -cents] for name, cents in entries if cents < 0]
+    creditors = [[name, cents] for name, cents in entries if cents > 0]
+    transfers = []
+    i = j = 0
+    while i < len(debtors) and j < len(creditors):
+        amount = min(debtors[i][1], creditors[j][1])
+        transfers.append((debtors[i][0], creditors[j][0], amount))
+        debtors[i][1] -= amount
+        creditors[j][1] -= amount
+        if debtors[i][1] == 0:
+            i += 1
+        if creditors[j][1] == 0:
+            j += 1
+    return transfers
+
+
+def _zero_sum_subsets(rest, node_budget, time_budget_ms):
+    """Split zero-sum subsets of size >= 3 off ``rest``, smallest first.
+
+    Returns ``(subsets, remainder)``.
+    """
+    deadline = time.perf_counter() + time_budget_ms / 1000
+    groups = []
+    nodes = 0
+    exhausted = False
+    size = 3
+    while not exhausted and size < len(rest):
+        for combo in combinations(range(len(rest)), size):
+            nodes += 1
+            if nodes > node_budget or (nodes % 256 == 0 and time.perf_counter() > deadline):
+                exhausted = True
+                break
+            if sum(rest[k][1] for k in combo) == 0:
+                groups.append([rest[k] for k in combo])
+                rest = [e for k, e in enumerate(rest) if k not in combo]
+                size = 2  # restart from the smallest size on the smaller set
+                break
+        size += 1
+    return groups, rest
+
+
+def settle_balances(balances, node_budget=20000, time_budget_ms=50):
+    """Return a short list of transfers that settles ``balances``.
+
+    A group of ``n`` people whose balances sum to zero can always be settled
+    with ``n - 1`` transfers, so the fewer people each zero-sum group holds,
+    the fewer transfers overall. The solver:
+
+    1. cancels exact debtor/creditor pairs (one transfer each),
+    2. searches for further zero-sum subsets, smallest first, until
+       ``node_budget`` subsets were examined or ``time_budget_ms`` elapsed,
+    3. settles whatever is left greedily.
+
+    If plain greedy over all balances needs fewer transfers, that is used instead.
+
+    Returns ``[{"from", "to", "amount"}]`` like ``calculate_reimbursements``.
+    """
+    entries = [[name, to_cents(balance)] for name, balance in balances.items()]
+    entries = [e for e in entries if e[1] != 0]
+    groups = []
+
+    # 1. Exact pairs
+    debtors_by_amount = {}
+    for entry in entries:
+        if entry[1] < 0:
+            debtors_by_amount.setdefault(-entry[1], []).append(entry)
+    paired = set()
+    for entry in entries:
+        if entry[1] > 0 and debtors_by_amount.get(entry[1]):
+            debtor = debtors_by_amount[entry[1]].pop(0)
+            groups.append([debtor, entry])
+            paired.update((id(debtor), id(entry)))
+    rest = [e for e in entries if id(e) not in paired]
+
+    # 2. Zero-sum subsets of size >= 3, within the search budget
+    found, rest = _zero_sum_subsets(rest, node_budget, time_budget_ms)
+    groups.extend(found)
+
+    # 3. Greedy on each group and on the remainder
+    transfers = []
+    for group in groups + [rest]:
+        transfers.extend(_greedy_transfers(group))
+    # The subsets taken first can split groups that greedy alone closes in
+    # listing order, so never return more transfers than plain greedy
+    greedy = _greedy_transfers(entries)
+    if len(greedy) < len(transfers):
+        transfers = greedy
+    # Keep the listing stable: debtors in the order the balances came in
+    order = {name: idx for idx, (name, _) in enumerate(entries)}
+    transfers.sort(key=lambda t: order[t[0]])
+    return [{"from": d, "to": c, "amount": cents / 100} for d, c, cents in transfers]
+
+
+def settle_with_app_budget(balances):
+    """Run ``settle_balances`` with the search budget from the app config.
+
+    Callers memoize the result per plan revision (see ``memoize_plan``) so
+    the search runs once per change rather than once per page view.
+    """
+    cfg = current_app.config
+    return settle_balances(
+        balances,
+        node_budget=cfg.get("SETTLEMENT_NODE_BUDGET", 20000),
+        time_budget_ms=cfg.get("SETTLEMENT_TIME_BUDGET_MS", 50),
+    )
@@ -0,0 +1,97 @@
+from sqlalchemy import case, func
+from backend.models import db, Expense, ExpenseShare
+
+REIMBURSEMENT = "Reimbursement"
+
+
+def to_cents(value) -> int:
+    """Convert a money amount (float, str or None) to integer cents."""
+    return int(round(float(value or 0) * 100))
+
+
+def from_cents(cents_by_name: dict) -> dict:
+    """Convert ``{name: cents}`` back to ``{name: amount}`` with two decimals."""
+    return {name: cents / 100 for name, cents in cents_by_name.items()}
+
+
+def compute_plan_totals(expenses):
+    """Compute balances, total expenses and real expenses in one pass.
+
+    ``expenses`` is the list of expense dicts returned by the plan expenses API.
+    All arithmetic is done in integer cents, so results are exact and can be
+    compared with ``== 0``. Returns ``(balances, total_expense, real_expense)``
+    as ``{name: cents}`` dicts whose key order matches what
+    ``calculate_balance``, ``calculate_expense`` and ``calculate_real_expense``
+    have always produced.
+    """
+    balances = {}
+    total_expense = {}
+    real_expense = {}
+    for expense in expenses:
+        payer = expense.get("payer")
+        amount = round((expense.get("amount") or 0) * 100)
+        participants = expense.get("participants") or []
+        amount_details = expense.get("amount_details") or {}
+        is_reimbursement = expense.get("name") == REIMBURSEMENT
+
+        if payer is not None and payer not in balances:
+            balances[payer] = 0
+        real_expense[payer] = real_expense.get(payer, 0) + amount
+
+        for participant in participants:
+            share = round((amount_details.get(participant) or 0) * 100)
+            # Balance: payer is credited the amount minus their own share
+            if participant == payer:
+                balances[participant] = balances.get(participant, 0) + amount - share
+            else:
+                balances[participant] = balances.get(participant, 0) - share
+            # Totals skip reimbursements, which only move money around;
+            # real expenses only count them
+            if is_reimbursement:
+                total_expense.setdefault(participant, 0)
+                real_expense[participant] = real_expense.get(participant, 0) - share
+            else:
+                total_expense[participant] = total_expense.get(participant, 0) + share
+                real_expense.setdefault(participant, 0)
+
+        if payer is not None and payer not in participants:
+            balances[payer] += amount
+
+    return balances, total_expense, real_expense
+
+
+def aggregate_plan_totals(plan_id):
+    """Compute ``(total_expense, real_expense)`` for a plan with GROUP BY queries.
+
+    Same results as ``compute_plan_totals`` (in ``{name: cents}``), but the
+    sums run in the database, so two queries return O(participants) rows
+    instead of every share. Uses only portable SQL (SUM/CASE), which works on
+    SQLite, PostgreSQL and MySQL alike.
+    """
+    is_reimbursement = Expense.description == REIMBURSEMENT
+    share_rows = (
+        db.session.query(
+            ExpenseShare.name,
+            func.sum(case((is_reimbursement, 0), else_=ExpenseShare.amount)),
+            func.sum(case((is_reimbursement, ExpenseShare.amount), else_=0)),
+        )
+        .join(Expense, Expense.id == ExpenseShare.expense_id)
+        .filter(Expense.plan_id == plan_id)
+        .group_by(ExpenseShare.name)
+        .all()
+    )
+    payer_rows = (
+        db.session.query(Expense.payer_name, func.sum(Expense.amount))
+        .filter(Expense.plan_id == plan_id)
+        .group_by(Expense.payer_name)
+        .all()
+    )
+
+    total_expense = {}
+    real_expense = {}
+    for payer, paid in payer_rows:
+        real_expense[payer] = to_cents(paid)
+    for name, spent, reimbursed in share_rows:
+        total_expense[name] = to_cents(spent)
+        real_expense[name] = real_expense.get(name, 0) - to_cents(reimbursed)
+    return total_expense, real_expense
@@ -1,52 +1,106 @@
-from backend.models import Plan, PlanParticipant, Expense, ExpenseShare, db
+from flask import current_app
+from sqlalchemy import or_, select, union
+from backend.models import (
+    db,
+    Expense,
+    ExpenseDailyRollup,
+    ExpenseShare,
+    GuestSlot,
+    Plan,
+    PlanBalance,
+    PlanParticipant,
+    User,
+)
+
+# Guests deleted per round of statements, to stay well under bound-parameter limits
+DELETE_CHUNK_SIZE = 500
+
+
+def delete_guest_users(user_ids):
+    """Delete guest users and everything linked to them with set-based statements.
+
+    Removes the plans the guests created (with their expenses, shares and
+    participants), the expenses they paid and the shares and participations
+    naming them in other plans, and frees their guest slots. Those other
+    plans get their ledger and rollups dropped (rebuilt on next read) and
+    their revision bumped.
+
+    Per chunk of ``DELETE_CHUNK_SIZE`` ids, three queries collect the guest
+    and plan keys, then a fixed number of DELETE/UPDATE statements run on
+    those keys; no ORM objects are loaded. Ids of non-guest users are
+    ignored. Runs in the caller's transaction; nothing is committed here.
+    """
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), DELETE_CHUNK_SIZE):
+        _delete_guest_chunk(user_ids[start : start + DELETE_CHUNK_SIZE])
+
+
+def _delete_guest_chunk(user_ids):
+    guests = db.session.execute(
+        select(User.id, User.username).where(User.id.in_(user_ids), User.is_guest.is_(True))
+    ).all()
+    if not guests:
+        return
+    guest_ids = [row.id for row in guests]
+    guest_names = [row.username for row in guests]
+    # Ids are read into lists up front: MySQL rejects an UPDATE/DELETE whose
+    # subquery reads the table being changed
+    owned_plan_ids = db.session.scalars(select(Plan.id).where(Plan.created_by.in_(guest_ids))).all()
+    # Expenses in the guests' own plans and those they paid anywhere else
+    doomed_expense = or_(
+        Expense.plan_id.in_(owned_plan_ids),
+        Expense.payer_id.in_(guest_ids),
+        Expense.payer_name.in_(guest_names),
+    )
+    touched_plan_ids = db.session.scalars(
+        union(
+            select(Expense.plan_id).where(doomed_expense),
+            select(Expense.plan_id)
+            .join(ExpenseShare, ExpenseShare.expense_id == Expense.id)
+            .where(ExpenseShare.name.in_(guest_names)),
+        )
+    ).all()
+    touched_plan_ids = sorted(set(touched_plan_ids) | set(owned_plan_ids))
+
+    Plan.query.filter(Plan.id.in_(touched_plan_ids)).update(
+        {Plan.revision: Plan.revision + 1}, synchronize_session=False
+    )
+    PlanBalance.query.filter(PlanBalance.plan_id.in_(touched_plan_ids)).delete(
+        synchronize_session=False
+    )
+    ExpenseDailyRollup.query.filter(ExpenseDailyRollup.plan_id.in_(touched_plan_ids)).delete(
+        synchronize_session=False
+    )
+    ExpenseShare.query.filter(
+        or_(
+            ExpenseShare.expense_id.in_(select(Expense.id).where(doomed_expense)),
+            ExpenseShare.name.in_(guest_names),
+        )
+    ).delete(synchronize_session=False)
+    Expense.query.filter(doomed_expense).delete(synchronize_session=False)
+    PlanParticipant.query.filter(
+        or_(PlanParticipant.plan_id.in_(owned_plan_ids), PlanParticipant.user_id.in_(guest_ids))
+    ).delete(synchronize_session=False)
+    # "fetch" detaches matching objects already in the session without loading others
+    Plan.query.filter(Plan.id.in_(owned_plan_ids)).delete(synchronize_session="fetch")
+    GuestSlot.query.filter(GuestSlot.user_id.in_(guest_ids)).update(
+        {"user_id": None, "expires_at": None}, synchronize_session=False
+    )
+    User.query.filter(User.id.in_(guest_ids)).delete(synchronize_session="fetch")
 
 
 def delete_guest_user(user):
     """
     Deletes a user and cascades deletions to their plans and related data.
     """
+    user_id = user.id
     try:
-        username = user.username
-
-        # Plans the guest created (remove everything linked to them)
-        owned_plans = Plan.query.filter_by(created_by=user.id).all()
         # Detach plan objects so later attribute access (e.g., plan.id in tests)
         # does not trigger a refresh after the rows are deleted.
-        for p in owned_plans:
+        for p in Plan.query.filter_by(created_by=user.id).all():
             db.session.expunge(p)
-        plan_ids = [p.id for p in owned_plans]
-        if plan_ids:
-            # Remove expense shares first to avoid FK issues when deleting expenses
-            expense_ids_subq = db.session.query(Expense.id).filter(Expense.plan_id.in_(plan_ids))
-            ExpenseShare.query.filter(ExpenseShare.expense_id.in_(expense_ids_subq)).delete(
-                synchronize_session=False
-            )
-            Expense.query.filter(Expense.plan_id.in_(plan_ids)).delete(synchronize_session=False)
-            PlanParticipant.query.filter(PlanParticipant.plan_id.in_(plan_ids)).delete(
-                synchronize_session=False
-            )
-            Plan.query.filter(Plan.id.in_(plan_ids)).delete(synchronize_session=False)
-
-        # Remove expenses authored by the guest in other plans (match by payer name/id)
-        guest_expense_ids = [
-            e.id
-            for e in Expense.query.filter(
-                (Expense.payer_id == user.id) | (Expense.payer_name == username)
-            ).all()
-        ]
-        if guest_expense_ids:
-            ExpenseShare.query.filter(ExpenseShare.expense_id.in_(guest_expense_ids)).delete(
-                synchronize_session=False
-            )
-            Expense.query.filter(Expense.id.in_(guest_expense_ids)).delete(
-                synchronize_session=False
-            )
-
-        # Remove any lingering shares/participants that mention this guest
-        ExpenseShare.query.filter_by(name=username).delete(synchronize_session=False)
-        PlanParticipant.query.filter_by(user_id=user.id).delete(synchronize_session=False)
-
-        db.session.delete(user)
+        delete_guest_users([user.id])
         db.session.commit()
     except Exception:
+        current_app.logger.exception("Deleting guest user %s failed", user_id)
         db.session.rollback()
@@ -0,0 +1,38 @@
+"""Add plan_balances ledger table
+
+Revision ID: 5d1f7a2c9b31
+Revises: 4b2c3e0e9a0b
+Create Date: 2026-10-17
+
+Existing plans are not backfilled here: the application rebuilds a plan's
+ledger from its expenses the first time balances are read, or run
+``flask rebuild-ledger`` to do it eagerly.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "5d1f7a2c9b31"
+down_revision = "4b2c3e0e9a0b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "plan_balances",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("plan_id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("balance_cents", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["plan_id"],
+            ["plans.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("plan_id", "name", name="uq_plan_balances_plan_id_name"),
+    )
+
+
+def downgrade():
+    op.drop_table("plan_balances")
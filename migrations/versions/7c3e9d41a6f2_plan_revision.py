@@ -0,0 +1,24 @@
+"""Add plans.revision counter
+
+Revision ID: 7c3e9d41a6f2
+Revises: 5d1f7a2c9b31
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7c3e9d41a6f2"
+down_revision = "5d1f7a2c9b31"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("plans") as batch_op:
+        batch_op.add_column(sa.Column("revision", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    with op.batch_alter_table("plans") as batch_op:
+        batch_op.drop_column("revision")
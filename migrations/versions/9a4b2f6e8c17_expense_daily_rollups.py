@@ -0,0 +1,38 @@
+"""Add expense_daily_rollups table
+
+Revision ID: 9a4b2f6e8c17
+Revises: 7c3e9d41a6f2
+Create Date: 2026-10-17
+
+Existing plans are rolled up lazily the first time their time series is read.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "9a4b2f6e8c17"
+down_revision = "7c3e9d41a6f2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "expense_daily_rollups",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("plan_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("spent_cents", sa.BigInteger(), nullable=False),
+        sa.Column("paid_cents", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["plan_id"],
+            ["plans.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("plan_id", "day", "name", name="uq_expense_daily_rollups_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("expense_daily_rollups")
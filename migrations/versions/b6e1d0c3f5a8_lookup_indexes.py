@@ -0,0 +1,59 @@
+"""Add foreign-key and lookup indexes
+
+Revision ID: b6e1d0c3f5a8
+Revises: 9a4b2f6e8c17
+Create Date: 2026-10-17
+
+On PostgreSQL the indexes are built with CREATE INDEX CONCURRENTLY outside
+the migration transaction, so production tables stay writable while they
+build. Set MIGRATION_INDEX_CONCURRENTLY=false to build them in the
+transaction instead (faster on an idle database). If a concurrent build is
+interrupted, drop the INVALID index and rerun the migration.
+"""
+
+import os
+from alembic import op
+
+revision = "b6e1d0c3f5a8"
+down_revision = "9a4b2f6e8c17"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_plans_created_by", "plans", ["created_by"]),
+    ("ix_plan_participants_plan_id_user_id", "plan_participants", ["plan_id", "user_id"]),
+    ("ix_plan_participants_user_id", "plan_participants", ["user_id"]),
+    ("ix_expenses_plan_id_date", "expenses", ["plan_id", "date"]),
+    ("ix_expenses_payer_name", "expenses", ["payer_name"]),
+    ("ix_expenses_payer_id", "expenses", ["payer_id"]),
+    ("ix_expense_shares_expense_id", "expense_shares", ["expense_id"]),
+    ("ix_expense_shares_name", "expense_shares", ["name"]),
+]
+
+
+def _concurrently():
+    bind = op.get_bind()
+    enabled = os.environ.get("MIGRATION_INDEX_CONCURRENTLY", "true").lower() == "true"
+    return bind.dialect.name == "postgresql" and enabled
+
+
+def upgrade():
+    if _concurrently():
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(
+                    name, table, columns, postgresql_concurrently=True, if_not_exists=True
+                )
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    if _concurrently():
+        with op.get_context().autocommit_block():
+            for name, table, _ in reversed(INDEXES):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
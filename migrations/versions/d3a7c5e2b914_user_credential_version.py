@@ -0,0 +1,26 @@
+"""Add users.credential_version
+
+Revision ID: d3a7c5e2b914
+Revises: b6e1d0c3f5a8
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "d3a7c5e2b914"
+down_revision = "b6e1d0c3f5a8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(
+            sa.Column("credential_version", sa.Integer(), nullable=False, server_default="0")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("credential_version")
@@ -0,0 +1,28 @@
+"""Add scheduler_leases table
+
+Revision ID: e8c4b1f7a2d6
+Revises: d3a7c5e2b914
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "e8c4b1f7a2d6"
+down_revision = "d3a7c5e2b914"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "scheduler_leases",
+        sa.Column("name", sa.String(length=50), nullable=False),
+        sa.Column("holder", sa.String(length=100), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("scheduler_leases")
@@ -0,0 +1,31 @@
+"""Add guest_slots admission table
+
+Revision ID: f1a9d3c7b5e2
+Revises: e8c4b1f7a2d6
+Create Date: 2026-10-18
+
+Slots are created by the application on the first guest login (from
+GUEST_CAPACITY) or with ``flask guest-capacity <n>``.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "f1a9d3c7b5e2"
+down_revision = "e8c4b1f7a2d6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "guest_slots",
+        sa.Column("slot", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("slot"),
+    )
+
+
+def downgrade():
+    op.drop_table("guest_slots")
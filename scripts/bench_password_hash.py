@@ -0,0 +1,51 @@
+"""Benchmark password verification cost against login throughput.
+
+For each hashing method, times one verification and the logins per second
+that ``--threads`` concurrent verifications sustain, which is what a
+worker's PASSWORD_VERIFY_WORKERS pool would see.
+
+    python scripts/bench_password_hash.py
+    python scripts/bench_password_hash.py --threads 4 --logins 40 \\
+        --method pbkdf2:sha256:600000 --method scrypt:16384:8:1
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHODS = [
+    "pbkdf2:sha256:100000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:1000000",
+    "scrypt:16384:8:1",
+    "scrypt:32768:8:1",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--method", action="append", help="Werkzeug method (repeatable)")
+    parser.add_argument("--threads", type=int, default=3, help="Concurrent verifications")
+    parser.add_argument("--logins", type=int, default=30, help="Verifications per method")
+    args = parser.parse_args()
+
+    print(f"{'method':<24}{'verify (ms)':>12}{'logins/s':>10}{f'x{args.threads} (/s)':>12}")
+    for method in args.method or DEFAULT_METHODS:
+        pwhash = generate_password_hash("correct horse", method=method)
+        start = time.perf_counter()
+        for _ in range(args.logins):
+            check_password_hash(pwhash, "correct horse")
+        single = (time.perf_counter() - start) / args.logins
+
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            start = time.perf_counter()
+            hashes = [pwhash] * args.logins
+            list(pool.map(check_password_hash, hashes, ["correct horse"] * args.logins))
+            parallel = args.logins / (time.perf_counter() - start)
+        print(f"{method:<24}{single * 1000:>12.1f}{1 / single:>10.1f}{parallel:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
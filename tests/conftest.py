@@ -1,8 +1,18 @@
 import os
 import tempfile
+from contextlib import contextmanager
 import pytest
+from sqlalchemy import event
 from backend.app import create_app
-from backend.models import db, User, Plan, PlanParticipant, Expense, ExpenseShare
+from backend.models import (
+    db,
+    User,
+    Plan,
+    PlanBalance,
+    PlanParticipant,
+    Expense,
+    ExpenseShare,
+)
 
 
 @pytest.fixture(scope="function")
@@ -124,3 +134,41 @@ def guest_user_factory(app):
         return u
 
     return _create
+
+
+@pytest.fixture(scope="function")
+def logged_in_plan(client, user_factory, plan_factory):
+    """A plan "Trip" with Alice and Bob, owned by "owner" who is logged in on ``client``."""
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    return plan_factory(owner=u, name="Trip", participants=["Alice", "Bob"])
+
+
+@pytest.fixture(scope="function")
+def plan_ledger(app):
+    """Read a plan's ledger rows as ``{name: balance_cents}``."""
+
+    def _read(plan):
+        return {r.name: r.balance_cents for r in PlanBalance.query.filter_by(plan_id=plan.id)}
+
+    return _read
+
+
+@pytest.fixture(scope="function")
+def count_queries(app):
+    """Context manager collecting the SQL statements executed inside it."""
+
+    @contextmanager
+    def _count():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    return _count
@@ -1,4 +1,4 @@
-from backend.models import User
+from backend.models import User, db
 
 
 def test_register_and_login_flow(client):
@@ -51,3 +51,99 @@ def test_login_wrong_password(client, user_factory):
     # Should not create a session for wrong password
     with client.session_transaction() as sess:
         assert sess.get("username") is None
+
+
+def _user_lookup_samples():
+    from prometheus_client import REGISTRY
+
+    count = REGISTRY.get_sample_value("mycount_user_lookups_per_request_count") or 0
+    total = REGISTRY.get_sample_value("mycount_user_lookups_per_request_sum") or 0
+    return count, total
+
+
+def test_user_resolved_once_per_request(client, user_factory, plan_factory):
+    owner = user_factory("carol")
+    plan_factory(owner=owner)
+    with client.session_transaction() as sess:
+        sess["username"] = "carol"
+
+    # A username-only session is resolved once and upgraded with identity claims
+    count, total = _user_lookup_samples()
+    assert client.get("/plans/").status_code == 200
+    assert _user_lookup_samples() == (count + 1, total + 1)
+    with client.session_transaction() as sess:
+        assert sess["uid"] == owner.id
+
+    # Pages and APIs that only need the id are served from the claims
+    for path in ("/plans/", "/plans/api/plans", "/plans/TESTHASH", "/"):
+        before = _user_lookup_samples()
+        assert client.get(path).status_code == 200
+        assert _user_lookup_samples() == before, path
+
+    # Views that need the row share a single lookup with the template
+    count, total = _user_lookup_samples()
+    assert client.get("/profile").status_code == 200
+    assert _user_lookup_samples() == (count + 1, total + 1)
+
+
+def test_credential_change_revokes_other_sessions(app, user_factory):
+    user_factory("dave", password="old")
+    first, second = app.test_client(), app.test_client()
+    for c in (first, second):
+        c.post("/login", data={"username": "dave", "password": "old"})
+        assert c.get("/plans/api/plans").status_code == 200
+
+    first.post(
+        "/change-password",
+        data={"old_password": "old", "new_password": "new", "confirm_password": "new"},
+    )
+    assert User.query.filter_by(username="dave").first().credential_version == 1
+
+    # Within the verify interval the other session is still trusted
+    assert second.get("/plans/api/plans").status_code == 200
+    app.config["SESSION_VERIFY_INTERVAL"] = 0
+    assert second.get("/plans/api/plans").status_code == 302
+    with second.session_transaction() as sess:
+        assert "uid" not in sess
+    # The session that changed the password was refreshed and stays valid
+    assert first.get("/plans/api/plans").status_code == 200
+
+
+def test_login_rehashes_under_new_policy(app, client, user_factory):
+    user = user_factory("steve", password="secret")
+    assert user.password_hash.startswith("scrypt:")
+    version = user.credential_version
+
+    app.config["PASSWORD_HASH_METHOD"] = "pbkdf2:sha256:1000"
+    client.post("/login", data={"username": "steve", "password": "secret"})
+    db.session.refresh(user)
+    assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+    assert user.check_password("secret")
+    # Same password: existing sessions are not revoked
+    assert user.credential_version == version
+
+    # Wrong passwords never rewrite the hash
+    old_hash = user.password_hash
+    app.config["PASSWORD_HASH_METHOD"] = "scrypt"
+    client.post("/login", data={"username": "steve", "password": "wrong"})
+    db.session.refresh(user)
+    assert user.password_hash == old_hash
+
+
+def test_login_turned_away_when_verify_pool_is_full(app, client, user_factory):
+    from backend.utils.passwords import get_verify_pool
+
+    user_factory("steve", password="secret")
+    app.config.update(PASSWORD_VERIFY_WORKERS=1, PASSWORD_VERIFY_QUEUE=0)
+    pool = get_verify_pool()
+
+    pool._slots.acquire()
+    resp = client.post("/login", data={"username": "steve", "password": "secret"})
+    with client.session_transaction() as sess:
+        assert "uid" not in sess
+    pool._slots.release()
+
+    resp = client.post("/login", data={"username": "steve", "password": "secret"})
+    assert resp.status_code == 302
+    with client.session_transaction() as sess:
+        assert "uid" in sess
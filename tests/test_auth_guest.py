@@ -72,3 +72,47 @@ def test_delete_guest_user_function(plan_factory, expense_factory, guest_user_fa
     assert p is None
     e = Expense.query.filter_by(plan_id=plan.id).all()
     assert len(e) == 0
+
+
+def test_delete_guest_users_in_bulk(
+    user_factory, plan_factory, expense_factory, guest_user_factory, count_queries
+):
+    from backend.models import ExpenseShare, PlanBalance, PlanParticipant
+    from backend.utils.ledger import get_plan_balances
+    from backend.utils.user import delete_guest_users
+
+    guests = [guest_user_factory(username=f"guest-{i}") for i in range(3)]
+    own_plan_ids = []
+    for i, guest in enumerate(guests):
+        plan = plan_factory(owner=guest, name=f"G{i}")
+        expense_factory(plan=plan, payer_name="Alice")
+        plan.hash_id = f"GUEST{i}"
+        db.session.commit()
+        own_plan_ids.append(plan.id)
+    owner = user_factory("owner")
+    shared = plan_factory(owner=owner, participants=["Alice", guests[0]])
+    expense_factory(plan=shared, amount=20.0, payer_name="Alice", shares={"Alice": 20.0})
+    expense_factory(plan=shared, amount=30.0, payer_name="guest-0", shares={"Alice": 30.0})
+    expense_factory(plan=shared, amount=8.0, payer_name="Alice", shares={"guest-1": 8.0})
+    get_plan_balances(shared.id)
+    db.session.commit()
+    revision = shared.revision or 0
+    user_ids = [g.id for g in guests] + [owner.id]
+
+    with count_queries() as statements:
+        delete_guest_users(user_ids)
+        db.session.commit()
+    # A fixed number of statements whatever the number of guests: 3 lookups, 9 writes
+    assert len(statements) == 12
+
+    assert User.query.filter_by(is_guest=True).count() == 0
+    assert db.session.get(User, owner.id) is not None
+    assert Plan.query.filter(Plan.id.in_(own_plan_ids)).count() == 0
+    # The guest's expense is gone; an expense merely shared with a guest loses that share
+    assert [e.amount for e in Expense.query.filter_by(plan_id=shared.id)] == [20.0, 8.0]
+    assert ExpenseShare.query.filter(ExpenseShare.name.like("guest-%")).count() == 0
+    assert PlanParticipant.query.filter_by(plan_id=shared.id, name="guest-0").count() == 0
+    db.session.refresh(shared)
+    assert shared.revision == revision + 1
+    # The shared plan's ledger was dropped, to be rebuilt from the remaining rows
+    assert PlanBalance.query.filter_by(plan_id=shared.id).count() == 0
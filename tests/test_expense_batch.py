@@ -0,0 +1,112 @@
+import json
+from backend.models import Expense, db
+
+
+def _expense(name, amount, payer="Alice"):
+    return {
+        "name": name,
+        "amount": amount,
+        "payer": payer,
+        "date": "2025-01-02",
+        "participants": ["Alice", "Bob"],
+        "amounts": [amount / 2, amount / 2],
+    }
+
+
+def _batch(client, plan, operations):
+    return client.post(
+        f"/plans/api/plans/{plan.hash_id}/expenses/batch",
+        data=json.dumps({"operations": operations}),
+        content_type="application/json",
+    )
+
+
+def test_batch_applies_mixed_operations(client, expense_factory, logged_in_plan, plan_ledger):
+    plan = logged_in_plan
+    doomed = expense_factory(plan=plan, description="Old", amount=40.0, payer_name="Bob")
+    edited = expense_factory(plan=plan, description="Lunch", amount=20.0, payer_name="Alice")
+    revision = plan.revision or 0
+
+    resp = _batch(
+        client,
+        plan,
+        [
+            {"op": "create", "data": _expense("Dinner", 60.0)},
+            {
+                "op": "update",
+                "id": edited.id,
+                "data": {"amount": 30.0, "participants": ["Alice", "Bob"], "amounts": [15, 15]},
+            },
+            {"op": "delete", "id": doomed.id},
+        ],
+    )
+    assert resp.status_code == 200
+    results = resp.get_json()["results"]
+    assert [(r["index"], r["op"], r["status"]) for r in results] == [
+        (0, "create", "ok"),
+        (1, "update", "ok"),
+        (2, "delete", "ok"),
+    ]
+
+    db.session.refresh(plan)
+    assert plan.revision == revision + 1
+    descriptions = {e.description: e.amount for e in Expense.query.filter_by(plan_id=plan.id)}
+    assert descriptions == {"Dinner": 60.0, "Lunch": 30.0}
+    assert plan_ledger(plan) == {"Alice": 4500, "Bob": -4500}
+
+
+def test_batch_is_all_or_nothing(client, expense_factory, logged_in_plan):
+    plan = logged_in_plan
+    expense = expense_factory(plan=plan, amount=40.0, payer_name="Bob")
+    revision = plan.revision or 0
+
+    resp = _batch(
+        client,
+        plan,
+        [
+            {"op": "delete", "id": expense.id},
+            {"op": "create", "data": _expense("Dinner", 60.0)},
+            {"op": "update", "id": 999999, "data": {"amount": 1.0}},
+        ],
+    )
+    assert resp.status_code == 400
+    body = resp.get_json()
+    assert body["results"][-1]["index"] == 2
+    assert body["results"][-1]["status"] == "error"
+
+    db.session.expire_all()
+    assert [e.id for e in Expense.query.filter_by(plan_id=plan.id)] == [expense.id]
+    assert (plan.revision or 0) == revision
+
+
+def test_batch_rejects_bad_payloads(app, client, logged_in_plan):
+    plan = logged_in_plan
+    assert _batch(client, plan, []).status_code == 400
+    assert _batch(client, plan, [{"op": "rename"}]).status_code == 400
+    app.config["EXPENSE_BATCH_MAX"] = 2
+    too_many = [{"op": "create", "data": _expense(f"E{i}", 10.0)} for i in range(3)]
+    assert _batch(client, plan, too_many).status_code == 400
+
+
+def test_invalid_values_fail_the_operation_not_the_request(client, expense_factory, logged_in_plan):
+    plan = logged_in_plan
+    expense = expense_factory(plan=plan, description="Lunch", amount=20.0)
+    bad_operations = [
+        {"op": "create", "data": {**_expense("Dinner", 60.0), "amount": "sixty"}},
+        {"op": "create", "data": {**_expense("Dinner", 60.0), "amount": None}},
+        {"op": "create", "data": {**_expense("Dinner", 60.0), "amounts": [30, float("nan")]}},
+        {"op": "update", "id": expense.id, "data": {"amount": float("inf")}},
+        {"op": "delete", "id": [expense.id]},
+    ]
+    for operation in bad_operations:
+        resp = _batch(client, plan, [{"op": "create", "data": _expense("Ok", 10.0)}, operation])
+        assert resp.status_code == 400
+        assert resp.get_json()["results"][-1]["index"] == 1
+    assert [e.id for e in Expense.query.filter_by(plan_id=plan.id)] == [expense.id]
+
+    resp = client.post(
+        f"/plans/{plan.hash_id}/section/expenses",
+        data=json.dumps({**_expense("Dinner", 60.0), "amount": None}),
+        content_type="application/json",
+    )
+    assert resp.status_code == 400
@@ -0,0 +1,163 @@
+import csv
+import io
+import time
+import pytest
+from backend.models import User, db
+
+
+def test_csv_export_is_streamed_in_chunks(app, client, expense_factory, logged_in_plan):
+    plan = logged_in_plan
+    for i in range(5):
+        expense_factory(plan=plan, description=f"E{i}", amount=10.0 + i, shares={"Bob": 10.0 + i})
+    app.config["EXPORT_CHUNK_SIZE"] = 2
+
+    resp = client.get(f"/plans/{plan.hash_id}/export.csv")
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    chunks = list(resp.response)
+    # Header first, then one chunk per two expenses
+    assert len(chunks) == 4
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == ["date", "description", "amount", "payer", "owner", "Alice", "Bob"]
+    assert [row[1] for row in rows[1:]] == [f"E{i}" for i in range(5)]
+    assert rows[5][2:] == ["14.00", "Alice", "0.00", "0.00", "14.00"]
+
+
+def test_expense_rows_are_read_in_keyset_chunks(user_factory, plan_factory, expense_factory):
+    from datetime import datetime
+    from backend.routes.plans.helpers import iter_plan_expense_rows
+
+    plan = plan_factory(owner=user_factory("owner"), participants=["Alice"])
+    same_day = datetime(2026, 3, 1)
+    dates = [same_day, None, same_day, datetime(2026, 2, 1), same_day, None, same_day]
+    for i, date in enumerate(dates):
+        expense = expense_factory(plan=plan, description=f"E{i}", shares={"Alice": 1.0})
+        expense.date = date
+    db.session.commit()
+
+    seen = []
+    rows = [row.description for row, _ in iter_plan_expense_rows(plan.id, 2, seen.append)]
+    # Undated first, then by date; ties on the date split across chunks by id
+    assert rows == ["E1", "E5", "E3", "E0", "E2", "E4", "E6"]
+    assert seen == [2, 4, 6, 7]
+
+
+def test_xlsx_export_formats_and_sizes_columns(app, client, expense_factory, logged_in_plan):
+    import openpyxl
+
+    plan = logged_in_plan
+    for i in range(3):
+        expense_factory(plan=plan, description=f"Expense number {i}", amount=10.5)
+    app.config["EXPORT_CHUNK_SIZE"] = 2
+
+    resp = client.get(f"/plans/{plan.hash_id}/export.xlsx")
+    assert resp.status_code == 200
+    ws = openpyxl.load_workbook(io.BytesIO(resp.data)).active
+    rows = list(ws.iter_rows(values_only=True))
+    assert rows[0] == ("Date", "Description", "Amount", "Payer", "owner", "Alice", "Bob")
+    assert [row[1] for row in rows[1:]] == [f"Expense number {i}" for i in range(3)]
+    assert rows[1][2:] == (10.5, "Alice", 0.0, 30.0, 30.0)
+    assert ws["C2"].number_format == "0.00"
+    assert ws["E2"].number_format == "0.00"
+    assert ws["D2"].number_format == "General"
+    assert ws.column_dimensions["B"].width == len("Expense number 0") + 2
+
+
+def _wait_for_export(client, status_url):
+    for _ in range(200):
+        body = client.get(status_url).get_json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.02)
+    raise AssertionError("export did not finish")
+
+
+def test_background_export_is_reused_until_revision_changes(
+    app, client, tmp_path, expense_factory, logged_in_plan
+):
+    plan = logged_in_plan
+    expense_factory(plan=plan, description="Dinner")
+    app.config["EXPORT_DIR"] = str(tmp_path)
+
+    resp = client.post(f"/plans/{plan.hash_id}/exports", json={"format": "csv"})
+    assert resp.status_code == 202
+    job = _wait_for_export(client, resp.get_json()["status_url"])
+    assert job["status"] == "done"
+    assert (job["done"], job["total"]) == (1, 1)
+    download = client.get(job["download_url"])
+    assert download.status_code == 200
+    assert b"Dinner" in download.data
+    download.close()
+
+    # Same revision: the finished file is served again without a new job
+    again = client.post(f"/plans/{plan.hash_id}/exports", json={"format": "csv"}).get_json()
+    assert again["job_id"] == job["job_id"]
+    assert again["status"] == "done"
+
+    resp = client.post(
+        f"/plans/{plan.hash_id}/section/expenses",
+        json={
+            "name": "Taxi",
+            "amount": 20.0,
+            "payer": "Bob",
+            "date": "2025-01-03",
+            "participants": ["Alice", "Bob"],
+            "amounts": [10.0, 10.0],
+        },
+    )
+    assert resp.status_code == 201
+    resp = client.post(f"/plans/{plan.hash_id}/exports", json={"format": "csv"})
+    fresh = _wait_for_export(client, resp.get_json()["status_url"])
+    assert fresh["job_id"] != job["job_id"]
+    assert b"Taxi" in client.get(fresh["download_url"]).data
+    # The file of the previous revision is cleaned up
+    assert client.get(job["status_url"]).status_code == 404
+
+
+def test_background_export_rejects_unknown_jobs(app, client, tmp_path, logged_in_plan):
+    plan = logged_in_plan
+    app.config["EXPORT_DIR"] = str(tmp_path)
+    assert client.post(f"/plans/{plan.hash_id}/exports", json={"format": "pdf"}).status_code == 400
+    assert client.get(f"/plans/{plan.hash_id}/exports/..").status_code == 404
+    assert client.get(f"/plans/{plan.hash_id}/exports/r9.csv/download").status_code == 404
+
+
+def test_parquet_export_is_long_format(client, plan_factory, expense_factory, logged_in_plan):
+    pq = pytest.importorskip("pyarrow.parquet")
+    plan = logged_in_plan
+    expense_factory(plan=plan, description="Dinner", amount=60.0)
+    expense_factory(plan=plan, description="Taxi", amount=10.0, shares={"Bob": 10.0})
+    plan.hash_id = "FIRSTHASH"
+    db.session.commit()
+    other = plan_factory(owner=User.query.filter_by(username="owner").one(), name="Other")
+    expense_factory(plan=other, description="Hotel", amount=90.0, shares={"Alice": 90.0})
+
+    resp = client.get(f"/plans/{plan.hash_id}/export.parquet")
+    assert resp.status_code == 200
+    table = pq.read_table(io.BytesIO(resp.data))
+    assert str(table.schema.field("date").type) == "timestamp[us]"
+    assert str(table.schema.field("share").type) == "double"
+    rows = table.select(["description", "participant", "share"]).to_pylist()
+    assert rows == [
+        {"description": "Dinner", "participant": "Alice", "share": 30.0},
+        {"description": "Dinner", "participant": "Bob", "share": 30.0},
+        {"description": "Taxi", "participant": "Bob", "share": 10.0},
+    ]
+
+    # The multi-plan variant covers every plan the user participates in
+    resp = client.get("/plans/export.parquet")
+    assert resp.status_code == 200
+    table = pq.read_table(io.BytesIO(resp.data))
+    assert set(table.column("plan_hash_id").to_pylist()) == {"FIRSTHASH", other.hash_id}
+    assert table.num_rows == 4
+
+
+def test_arrow_export(client, expense_factory, logged_in_plan):
+    pa = pytest.importorskip("pyarrow")
+    plan = logged_in_plan
+    expense_factory(plan=plan, amount=60.0)
+    resp = client.get(f"/plans/{plan.hash_id}/export.arrow")
+    assert resp.status_code == 200
+    table = pa.ipc.open_file(io.BytesIO(resp.data)).read_all()
+    assert table.column("amount").to_pylist() == [60.0, 60.0]
@@ -0,0 +1,89 @@
+from datetime import datetime
+from sqlalchemy import event
+from backend.models import GuestSlot, User, db
+from backend.utils.guest_capacity import get_guest_capacity
+
+
+def _guest_login(app):
+    """Log a guest in from a fresh browser; return the client and the guest name."""
+    client = app.test_client()
+    client.get("/guestlogin")
+    with client.session_transaction() as sess:
+        return client, sess.get("username")
+
+
+def test_guest_admission_is_bounded_by_slots(app):
+    app.config["GUEST_CAPACITY"] = 2
+    logins = [_guest_login(app) for _ in range(2)]
+    assert all(name and name.startswith("guest-") for _, name in logins)
+    assert _guest_login(app)[1] is None
+    # Logging out deletes the guest and frees its slot
+    logins[1][0].get("/logout")
+    assert get_guest_capacity() == (2, 1)
+
+    assert _guest_login(app)[1] is not None
+    assert _guest_login(app)[1] is None
+    assert get_guest_capacity() == (2, 2)
+
+    # Expired slots are handed out again without waiting for the reaper
+    GuestSlot.query.filter_by(slot=1).update({"expires_at": datetime(2000, 1, 1)})
+    db.session.commit()
+    assert _guest_login(app)[1] is not None
+
+
+def test_lost_slot_races_move_on_to_other_free_slots(app):
+    app.config["GUEST_CAPACITY"] = 5
+    stolen = []
+
+    def steal(conn, cursor, statement, parameters, context, executemany):
+        # Another login takes the chosen slot right before this one claims it
+        if (
+            statement.startswith("UPDATE guest_slots SET user_id=?, expires_at=?")
+            and len(stolen) < 4
+        ):
+            slot = parameters[2]
+            stolen.append(slot)
+            cursor.execute(
+                "UPDATE guest_slots SET expires_at = '2999-01-01 00:00:00' WHERE slot = ?", (slot,)
+            )
+
+    event.listen(db.engine, "before_cursor_execute", steal)
+    try:
+        _, name = _guest_login(app)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", steal)
+    assert len(set(stolen)) == 4
+    # Four lost races still end with the last free slot, not "capacity reached"
+    assert name is not None
+    assert get_guest_capacity() == (5, 5)
+
+
+def test_guest_capacity_cli_raises_the_limit(app):
+    app.config["GUEST_CAPACITY"] = 1
+    assert _guest_login(app)[1] is not None
+    assert _guest_login(app)[1] is None
+
+    result = app.test_cli_runner().invoke(args=["guest-capacity", "3"])
+    assert result.exit_code == 0
+    assert "Guest capacity: 3 (1 in use)." in result.output
+    assert _guest_login(app)[1] is not None
+
+
+def test_guest_username_collision_is_retried(app, monkeypatch, guest_user_factory):
+    guest_user_factory(username="guest-aaaaaa", email="guest-aaaaaa@example.invalid")
+    tokens = iter(["aaaaaa", "bbbbbb"])
+    monkeypatch.setattr("backend.routes.auth.secrets.token_hex", lambda n: next(tokens))
+    hashes = []
+    monkeypatch.setattr(
+        "backend.routes.auth.hash_password", lambda password: hashes.append(password) or "x"
+    )
+
+    _, username = _guest_login(app)
+    assert username == "guest-bbbbbb"
+    # The random password is hashed once, not once per attempt
+    assert len(hashes) == 1
+    assert User.query.filter_by(username="guest-bbbbbb").one().is_guest
+    assert (
+        GuestSlot.query.filter_by(user_id=User.query.filter_by(username=username).one().id).count()
+        == 1
+    )
@@ -0,0 +1,46 @@
+from datetime import datetime
+from flask import session
+from backend.models import SchedulerLease, User, db
+from backend.utils.auth import login_user
+from backend.utils.guest_reaper import acquire_lease, reap_expired_guests
+
+
+def test_requests_leave_expired_guests_to_the_reaper(app, client, guest_user_factory):
+    expired = guest_user_factory(username="guest-old", expires_in_hours=-1)
+    with app.test_request_context():
+        login_user(expired)
+        claims = dict(session)
+    with client.session_transaction() as sess:
+        sess.update(claims)
+
+    # The expired session is logged out, but nothing is deleted inline
+    resp = client.get("/plans/")
+    assert resp.status_code == 302
+    assert client.get("/guestlogin").status_code == 302
+    assert db.session.get(User, expired.id) is not None
+
+
+def test_reaper_deletes_expired_guests_in_batches(app, guest_user_factory):
+    for i in range(5):
+        guest_user_factory(username=f"guest-old{i}", expires_in_hours=-1)
+    active = guest_user_factory(username="guest-new", expires_in_hours=1)
+
+    assert reap_expired_guests(batch_size=2, max_batches=2) == 4
+    assert User.query.filter(User.username.like("guest-old%")).count() == 1
+
+    result = app.test_cli_runner().invoke(args=["reap-guests"])
+    assert result.exit_code == 0
+    assert "Deleted 1 expired guest(s)." in result.output
+    assert [u.id for u in User.query.filter_by(is_guest=True)] == [active.id]
+
+
+def test_lease_has_a_single_holder(app):
+    assert acquire_lease("job", "a", ttl=60)
+    assert not acquire_lease("job", "b", ttl=60)
+    assert acquire_lease("job", "a", ttl=60)
+
+    # Once expired it can be taken over
+    SchedulerLease.query.filter_by(name="job").update({"expires_at": datetime(2000, 1, 1)})
+    db.session.commit()
+    assert acquire_lease("job", "b", ttl=60)
+    assert db.session.get(SchedulerLease, "job").holder == "b"
@@ -0,0 +1,100 @@
+import io
+from backend.models import db, Expense, ExpenseShare, Plan, PlanParticipant
+from backend.utils.ledger import get_plan_balances
+
+
+def _login(client, user_factory):
+    owner = user_factory("importer", password="pw")
+    client.post("/login", data={"username": "importer", "password": "pw"})
+    return owner
+
+
+def _empty_plan(owner, hash_id="TARGET"):
+    plan = Plan(name="Target", hash_id=hash_id, created_by=owner.id)
+    db.session.add(plan)
+    db.session.flush()
+    db.session.add(
+        PlanParticipant(plan_id=plan.id, user_id=owner.id, name=owner.username, role="owner")
+    )
+    for name in ("Alice", "Bob"):
+        db.session.add(PlanParticipant(plan_id=plan.id, name=name, role="member"))
+    db.session.commit()
+    return plan
+
+
+def test_import_round_trips_csv_and_xlsx_exports(
+    client, user_factory, plan_factory, expense_factory
+):
+    owner = _login(client, user_factory)
+    source = plan_factory(owner=owner)
+    expense_factory(plan=source, description="Dinner", amount=60.0)
+    expense_factory(plan=source, description="Taxi", amount=20.0, shares={"Bob": 20.0})
+
+    for fmt in ("csv", "xlsx"):
+        target = _empty_plan(owner, hash_id=f"T{fmt}")
+        exported = client.get(f"/plans/{source.hash_id}/export.{fmt}").data
+        resp = client.post(
+            f"/plans/{target.hash_id}/import",
+            data={"file": (io.BytesIO(exported), f"plan.{fmt}")},
+            content_type="multipart/form-data",
+        )
+        assert resp.status_code == 201, resp.get_json()
+        assert resp.get_json()["imported"] == 2
+        imported = Expense.query.filter_by(plan_id=target.id).order_by(Expense.id).all()
+        assert [(e.description, e.amount) for e in imported] == [("Dinner", 60.0), ("Taxi", 20.0)]
+        assert sorted((s.name, s.amount) for s in imported[1].shares) == [("Bob", 20.0)]
+        assert get_plan_balances(target.id) == {"Alice": 50.0, "Bob": -50.0}
+
+        # Importing again adds onto the existing ledger
+        client.post(
+            f"/plans/{target.hash_id}/import",
+            data={"file": (io.BytesIO(exported), f"plan.{fmt}")},
+            content_type="multipart/form-data",
+        )
+        assert get_plan_balances(target.id) == {"Alice": 100.0, "Bob": -100.0}
+
+
+def test_import_rejects_invalid_rows_without_inserting(client, user_factory):
+    owner = _login(client, user_factory)
+    target = _empty_plan(owner)
+    content = (
+        "date,description,amount,payer,Alice,Bob\n"
+        "2026-01-01,Lunch,30.00,Alice,15.00,15.00\n"
+        "not-a-date,Snacks,5.00,Alice,5.00,0.00\n"
+        "2026-01-02,Fuel,ten,Mallory,0.00,10.00\n"
+    )
+    resp = client.post(
+        f"/plans/{target.hash_id}/import",
+        data={"file": (io.BytesIO(content.encode()), "plan.csv")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+    assert [r["row"] for r in resp.get_json()["rows"]] == [3, 4]
+    assert Expense.query.filter_by(plan_id=target.id).count() == 0
+
+    unknown = "date,description,amount,payer,Alice,Zoe\n"
+    resp = client.post(
+        f"/plans/{target.hash_id}/import",
+        data={"file": (io.BytesIO(unknown.encode()), "plan.csv")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 400
+    assert "Zoe" in resp.get_json()["error"]
+
+
+def test_import_expenses_cli_in_batches(app, user_factory, tmp_path):
+    owner = user_factory("cli-owner")
+    target = _empty_plan(owner)
+    path = tmp_path / "expenses.csv"
+    lines = ["date,description,amount,payer,Alice,Bob"]
+    lines += [f"2026-02-{1 + i % 28:02d},Item {i},10.00,Bob,5.00,5.00" for i in range(25)]
+    path.write_text("\n".join(lines) + "\n")
+
+    result = app.test_cli_runner().invoke(
+        args=["import-expenses", target.hash_id, str(path), "--batch-size", "7"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Imported 25 expense(s)" in result.output
+    assert Expense.query.filter_by(plan_id=target.id).count() == 25
+    assert ExpenseShare.query.count() == 50
+    assert get_plan_balances(target.id) == {"Alice": -125.0, "Bob": 125.0}
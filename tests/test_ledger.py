@@ -0,0 +1,99 @@
+import json
+from backend.models import PlanBalance, db
+from backend.routes.plans import calculate_balance
+from backend.utils.ledger import get_plan_balances, rebuild_plan_ledger
+
+
+def test_expense_writes_update_ledger(client, logged_in_plan, plan_ledger):
+    plan = logged_in_plan
+    base = f"/plans/{plan.hash_id}/section/expenses"
+    payload = {
+        "name": "Dinner",
+        "amount": 60.0,
+        "payer": "Alice",
+        "date": "2025-01-02",
+        "participants": ["Alice", "Bob"],
+        "amounts": ["30.00", "30.00"],
+    }
+    resp = client.post(base, data=json.dumps(payload), content_type="application/json")
+    assert resp.status_code == 201
+    assert plan_ledger(plan) == {"Alice": 3000, "Bob": -3000}
+
+    expense_id = plan.expenses[0].id
+    payload.update({"amount": 90.0, "payer": "Bob", "amounts": ["45.00", "45.00"]})
+    resp = client.put(
+        f"{base}/{expense_id}", data=json.dumps(payload), content_type="application/json"
+    )
+    assert resp.status_code == 200
+    assert plan_ledger(plan) == {"Alice": -4500, "Bob": 4500}
+
+    resp = client.delete(f"{base}/{expense_id}")
+    assert resp.status_code == 200
+    assert plan_ledger(plan) == {"Alice": 0, "Bob": 0}
+
+
+def test_ledger_rebuild_matches_replay(plan_factory, expense_factory):
+    plan = plan_factory()
+    expense_factory(plan=plan, amount=60.0, payer_name="Alice")
+    expense_factory(plan=plan, amount=10.0, payer_name="Carol", shares={"Alice": 3.33, "Bob": 6.67})
+
+    # No ledger rows yet: the first read rebuilds from raw rows
+    balances = get_plan_balances(plan.id)
+    expected = calculate_balance(
+        [
+            {
+                "payer": "Alice",
+                "amount": 60.0,
+                "participants": ["Alice", "Bob"],
+                "amount_details": {"Alice": 30.0, "Bob": 30.0},
+            },
+            {
+                "payer": "Carol",
+                "amount": 10.0,
+                "participants": ["Alice", "Bob"],
+                "amount_details": {"Alice": 3.33, "Bob": 6.67},
+            },
+        ]
+    )
+    assert balances == expected
+
+    # A corrupted ledger is repaired by an explicit rebuild
+    PlanBalance.query.filter_by(plan_id=plan.id, name="Bob").update({"balance_cents": 1})
+    db.session.commit()
+    rebuild_plan_ledger(plan.id)
+    db.session.commit()
+    assert get_plan_balances(plan.id) == expected
+
+
+def test_rebuild_ledger_cli(app, plan_factory, expense_factory, plan_ledger):
+    plan = plan_factory()
+    expense_factory(plan=plan, amount=60.0, payer_name="Alice")
+
+    revision = plan.revision or 0
+
+    result = app.test_cli_runner().invoke(args=["rebuild-ledger", "--plan", plan.hash_id])
+    assert result.exit_code == 0
+    assert plan_ledger(plan) == {"Alice": 3000, "Bob": -3000}
+    db.session.refresh(plan)
+    assert plan.revision == revision + 1
+
+
+def test_expense_write_on_plan_without_ledger(client, expense_factory, logged_in_plan, plan_ledger):
+    plan = logged_in_plan
+    expense_factory(plan=plan, amount=60.0, payer_name="Alice")
+    payload = {
+        "name": "Taxi",
+        "amount": 20.0,
+        "payer": "Bob",
+        "date": "2025-01-03",
+        "participants": ["Alice", "Bob"],
+        "amounts": ["10.00", "10.00"],
+    }
+    resp = client.post(
+        f"/plans/{plan.hash_id}/section/expenses",
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    assert resp.status_code == 201
+    # The pre-existing expense is part of the ledger, not only the new one
+    assert plan_ledger(plan) == {"Alice": 2000, "Bob": -2000}
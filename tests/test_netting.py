@@ -0,0 +1,76 @@
+from backend.models import db, Plan, PlanParticipant
+from backend.utils.netting import net_positions
+
+
+def _plan(owner, hash_id, members):
+    plan = Plan(name=f"Plan {hash_id}", hash_id=hash_id, created_by=owner.id)
+    db.session.add(plan)
+    db.session.flush()
+    for user_id, name in members:
+        db.session.add(PlanParticipant(user_id=user_id, plan_id=plan.id, name=name))
+    db.session.commit()
+    return plan
+
+
+def test_net_positions_across_plans(user_factory, expense_factory):
+    me = user_factory("me")
+    friend = user_factory("friend")
+    trip = _plan(me, "TRIP", [(me.id, "Me"), (friend.id, "Fred"), (None, "Carol")])
+    flat = _plan(me, "FLAT", [(me.id, "Me2"), (friend.id, "F")])
+
+    # Trip: I paid 90 split three ways; Fred owes me 30, Carol owes me 30
+    expense_factory(
+        plan=trip, amount=90.0, payer_name="Me", shares={"Me": 30, "Fred": 30, "Carol": 30}
+    )
+    # Flat: friend paid 100 split evenly; I owe them 50
+    expense_factory(plan=flat, amount=100.0, payer_name="F", shares={"Me2": 50, "F": 50})
+
+    positions = net_positions(me.id)
+    assert positions == [
+        {
+            "counterparty": "Carol",
+            "amount": 30.0,
+            "plans": [{"hash_id": "TRIP", "name": "Plan TRIP", "amount": 30.0}],
+        },
+        {
+            "counterparty": "friend",
+            "amount": -20.0,
+            "plans": [
+                {"hash_id": "FLAT", "name": "Plan FLAT", "amount": -50.0},
+                {"hash_id": "TRIP", "name": "Plan TRIP", "amount": 30.0},
+            ],
+        },
+    ]
+
+
+def test_settlement_through_a_third_person_nets_out(user_factory, expense_factory):
+    from backend.routes.plans import plan_reimbursements
+
+    me = user_factory("me")
+    plan = _plan(me, "CHAIN", [(me.id, "A"), (None, "B"), (None, "C")])
+    # A pays for B, B pays for C, then C repays A: everyone is square
+    expense_factory(plan=plan, amount=30.0, payer_name="A", shares={"B": 30})
+    expense_factory(plan=plan, amount=30.0, payer_name="B", shares={"C": 30})
+    expense_factory(
+        plan=plan, description="Reimbursement", amount=30.0, payer_name="C", shares={"A": 30}
+    )
+
+    assert plan_reimbursements(plan) == []
+    assert net_positions(me.id) == []
+
+
+def test_index_net_mode(client, user_factory, plan_factory, expense_factory):
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    plan = plan_factory(owner=u, participants=["Bob"])
+    expense_factory(plan=plan, amount=20.0, payer_name="owner", shares={"owner": 10, "Bob": 10})
+
+    resp = client.get("/?mode=net")
+    assert resp.status_code == 200
+    assert b"net-reimbursements" in resp.data
+    assert b"owes You: $10.00" in resp.data
+    # The per-plan breakdown is rendered inside the counterparty's own entry
+    assert f'<a href="/plans/{plan.hash_id}">{plan.name}</a>: 10.00'.encode() in resp.data
+
+    resp = client.get("/plans/api/netting")
+    assert resp.get_json()[0]["plans"][0]["hash_id"] == plan.hash_id
@@ -0,0 +1,67 @@
+import json
+from backend.models import db, Plan
+from backend.utils.plan_cache import LRUCache, get_results_cache, memoize_plan
+
+
+def test_lru_cache_eviction_and_counters():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1}
+
+
+def test_memoize_plan_keyed_by_revision(plan_factory):
+    plan = plan_factory()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    first = memoize_plan(plan, "demo", compute)
+    first["value"] = "mutated by caller"
+    assert memoize_plan(plan, "demo", compute) == {"value": 1}
+    assert len(calls) == 1
+
+    plan.revision += 1
+    db.session.commit()
+    assert memoize_plan(plan, "demo", compute) == {"value": 2}
+
+
+def test_expense_mutation_bumps_revision_and_section_etag(client, user_factory, plan_factory):
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    plan = plan_factory(owner=u, participants=["Bob"])
+    url = f"/plans/{plan.hash_id}/section/reimbursements"
+
+    resp = client.get(url)
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    payload = {
+        "name": "Taxi",
+        "amount": 20.0,
+        "payer": "owner",
+        "date": "2025-03-01",
+        "participants": ["owner", "Bob"],
+        "amounts": ["10.00", "10.00"],
+    }
+    client.post(
+        f"/plans/{plan.hash_id}/section/expenses",
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    assert db.session.get(Plan, plan.id).revision == 1
+
+    resp = client.get(url, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert b"10.00" in resp.data
+    # The second render of the same revision comes from the cache
+    hits = get_results_cache().hits
+    client.get(f"/plans/{plan.hash_id}/section/reimbursements")
+    assert get_results_cache().hits > hits
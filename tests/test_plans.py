@@ -1,5 +1,5 @@
 import json
-from backend.models import Plan, PlanParticipant
+from backend.models import db, Plan, PlanParticipant
 
 
 def test_create_plan_minimal(client, user_factory):
@@ -39,3 +39,91 @@ def test_get_plans_api(client, user_factory, plan_factory):
     assert len(plans) == 1
     assert plans[0]["name"] == "Trip"
     assert "total_expenses" in plans[0]
+
+
+def test_get_plans_api_sorted_and_limited(client, user_factory, expense_factory):
+    from datetime import datetime
+
+    u = user_factory("alice", password="pw")
+    client.post("/login", data={"username": "alice", "password": "pw"}, follow_redirects=True)
+    for i, name in enumerate(["Beach", "Alps", "City"]):
+        plan = Plan(
+            name=name, hash_id=f"HASH{i}", created_by=u.id, created_at=datetime(2025, 1, i + 1)
+        )
+        db.session.add(plan)
+        db.session.flush()
+        db.session.add(PlanParticipant(user_id=u.id, plan_id=plan.id, name="alice"))
+        db.session.add(PlanParticipant(plan_id=plan.id, name="Bob"))
+        db.session.commit()
+        expense_factory(plan=plan, amount=10.0 * (i + 1), shares={"alice": 1})
+        expense_factory(plan=plan, description="Reimbursement", amount=99.0, shares={})
+
+    resp = client.get("/plans/api/plans?sort=created_at&order=desc&limit=2")
+    plans = resp.get_json()
+    assert [p["name"] for p in plans] == ["City", "Alps"]
+    assert plans[0]["participants"] == ["alice", "Bob"]
+    assert plans[0]["total_expenses"] == 30.0
+
+    resp = client.get("/plans/api/plans?sort=name")
+    assert [p["name"] for p in resp.get_json()] == ["Alps", "Beach", "City"]
+    assert client.get("/plans/api/plans?sort=owner").status_code == 400
+
+
+def test_expenses_api_keyset_pagination(client, user_factory, plan_factory, expense_factory):
+    from datetime import datetime
+
+    owner = user_factory("pager", password="pw")
+    client.post("/login", data={"username": "pager", "password": "pw"})
+    plan = plan_factory(owner=owner)
+    expenses = [expense_factory(plan=plan, description=f"E{i}") for i in range(7)]
+    # Several expenses share a date so the id tie-break is exercised
+    for i, e in enumerate(expenses):
+        e.date = datetime(2026, 1, 1 + i // 3)
+    db.session.commit()
+    expected = [e.id for e in sorted(expenses, key=lambda e: (e.date, e.id), reverse=True)]
+
+    url = f"/plans/api/plans/{plan.hash_id}/expenses"
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get(url, query_string=query).get_json()
+        assert len(page["expenses"]) <= 3
+        seen.extend(e["id"] for e in page["expenses"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    # Without pagination parameters the full list keeps its original shape
+    assert [e["id"] for e in client.get(url).get_json()] == sorted(expected)
+    assert client.get(url, query_string={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get(url, query_string={"limit": 0}).status_code == 400
+
+
+def test_expenses_section_renders_first_page_only(
+    app, client, user_factory, plan_factory, expense_factory
+):
+    import re
+
+    owner = user_factory("sectioner", password="pw")
+    client.post("/login", data={"username": "sectioner", "password": "pw"})
+    plan = plan_factory(owner=owner)
+    for i in range(5):
+        expense_factory(plan=plan, description=f"E{i}")
+    app.config["EXPENSES_PAGE_SIZE"] = 2
+
+    html = client.get(f"/plans/{plan.hash_id}/section/expenses").get_data(as_text=True)
+    ids = re.findall(r'data-id="(\d+)"', html)
+    assert len(ids) == 2
+    cursor = re.search(r'data-cursor="([^"]+)"', html).group(1)
+
+    while cursor:
+        page = client.get(
+            f"/plans/{plan.hash_id}/section/expenses/page", query_string={"cursor": cursor}
+        ).get_data(as_text=True)
+        ids.extend(re.findall(r'data-id="(\d+)"', page))
+        # All expenses share today's date, so continuation pages repeat no header
+        assert "eyebrow" not in page
+        match = re.search(r'data-cursor="([^"]+)"', page)
+        cursor = match.group(1) if match else None
+    assert len(ids) == len(set(ids)) == 5
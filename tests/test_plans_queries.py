@@ -0,0 +1,55 @@
+from backend.models import db
+
+
+def test_expense_endpoints_query_count_is_flat(
+    client, user_factory, plan_factory, expense_factory, count_queries
+):
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    plan = plan_factory(owner=u)
+    urls = [
+        f"/plans/api/plans/{plan.hash_id}/expenses",
+        f"/plans/{plan.hash_id}/export.csv",
+        f"/plans/{plan.hash_id}/export.xlsx",
+    ]
+
+    def counts():
+        result = []
+        for url in urls:
+            with count_queries() as statements:
+                assert client.get(url).status_code == 200
+            result.append(len(statements))
+        return result
+
+    for _ in range(3):
+        expense_factory(plan=plan)
+    small = counts()
+    for _ in range(30):
+        expense_factory(plan=plan)
+    assert counts() == small
+
+
+def test_plan_authorization_is_one_query_regardless_of_membership_count(
+    app, client, user_factory, plan_factory, count_queries
+):
+    from backend.models import Plan, PlanParticipant
+
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"})
+    plan = plan_factory(owner=u)
+    for i in range(20):
+        extra = Plan(name=f"Extra {i}", hash_id=f"EXTRA{i:03d}", created_by=u.id)
+        db.session.add(extra)
+        db.session.flush()
+        db.session.add(PlanParticipant(plan_id=extra.id, user_id=u.id, name="Me", role="owner"))
+    db.session.commit()
+
+    url = f"/plans/{plan.hash_id}/section/expenses"
+    with count_queries() as statements:
+        assert client.get(url).status_code == 200
+    # membership query + expenses + participants
+    assert len(statements) == 3
+
+    # Leaving the plan revokes access immediately
+    assert client.delete(f"/plans/api/plans/{plan.hash_id}").status_code == 200
+    assert client.get(url).status_code == 404
@@ -0,0 +1,80 @@
+from backend.utils.rate_limit import (
+    RATE_LIMITED,
+    MemoryRateLimitStore,
+    SQLiteRateLimitStore,
+    get_rate_limiter,
+)
+
+
+def _rejected(endpoint, key):
+    return RATE_LIMITED.labels(endpoint=endpoint, key=key)._value.get()
+
+
+def test_memory_store_sliding_window():
+    store = MemoryRateLimitStore()
+    assert [store.hit("k", 3, 60, now=600.0) for _ in range(4)] == [0, 0, 0, 60]
+    # Halfway into the next window the three hits still weigh 1.5
+    assert [store.hit("k", 3, 60, now=690.0) for _ in range(3)] == [0, 0, 30]
+    # Two windows later they are forgotten
+    assert store.hit("k", 3, 60, now=780.0) == 0
+    assert store.hit("other", 3, 60, now=600.0) == 0
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+    assert first.hit("k", 2, 60, now=600.0) == 0
+    assert second.hit("k", 2, 60, now=600.0) == 0
+    assert first.hit("k", 2, 60, now=630.0) == 30
+    assert second.hit("k", 2, 60, now=690.0) == 0
+
+
+def test_login_is_throttled_before_any_query(app, client, user_factory, count_queries):
+    user_factory("alice", password="secret")
+    app.config["RATE_LIMIT_LOGIN_PER_USERNAME"] = 2
+    app.extensions.pop("rate_limiter", None)
+    for _ in range(2):
+        client.post("/login", data={"username": "alice", "password": "wrong"})
+    before = _rejected("login", "username")
+
+    with count_queries() as statements:
+        resp = client.post("/login", data={"username": "Alice", "password": "secret"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) > 0
+    assert b"Too many attempts" in resp.data
+    assert statements == []
+    assert _rejected("login", "username") == before + 1
+    # Other accounts from the same address are not affected
+    resp = client.post("/login", data={"username": "bob", "password": "x"})
+    assert resp.status_code == 302
+
+
+def test_guest_login_is_throttled_per_ip(app, count_queries):
+    app.config["RATE_LIMIT_GUEST_PER_IP"] = 1
+    app.extensions.pop("rate_limiter", None)
+    assert app.test_client().get("/guestlogin").status_code == 302
+    with count_queries() as statements:
+        resp = app.test_client().get("/guestlogin")
+    assert resp.status_code == 429
+    assert statements == []
+
+
+def test_clients_behind_the_proxy_are_limited_separately(app):
+    app.config["RATE_LIMIT_GUEST_PER_IP"] = 1
+    app.extensions.pop("rate_limiter", None)
+
+    def guest_login(client_ip):
+        return app.test_client().get(
+            "/guestlogin",
+            headers={"X-Forwarded-For": client_ip},
+            environ_base={"REMOTE_ADDR": "10.0.0.2"},
+        )
+
+    assert guest_login("198.51.100.1").status_code == 302
+    assert guest_login("198.51.100.2").status_code == 302
+    assert guest_login("198.51.100.1").status_code == 429
+
+
+def test_rate_limiting_can_be_turned_off(app):
+    app.config["RATE_LIMIT_BACKEND"] = "off"
+    assert get_rate_limiter() is None
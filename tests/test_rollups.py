@@ -0,0 +1,98 @@
+import json
+from datetime import date, datetime
+from backend.models import db, Expense, ExpenseDailyRollup, ExpenseShare
+from backend.utils.rollups import choose_bucket, spending_timeseries
+
+
+def _add(plan, day, amount, payer, shares, description="Dinner"):
+    expense = Expense(
+        description=description, amount=amount, payer_name=payer, plan_id=plan.id, date=day
+    )
+    db.session.add(expense)
+    db.session.flush()
+    for name, share in shares.items():
+        db.session.add(ExpenseShare(expense_id=expense.id, name=name, amount=share))
+    db.session.commit()
+
+
+def test_expense_writes_update_daily_rollups(client, user_factory, plan_factory):
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    plan = plan_factory(owner=u, participants=["Bob"])
+    payload = {
+        "name": "Lunch",
+        "amount": 30.0,
+        "payer": "owner",
+        "date": "2025-05-02",
+        "participants": ["owner", "Bob"],
+        "amounts": ["10.00", "20.00"],
+    }
+    client.post(
+        f"/plans/{plan.hash_id}/section/expenses",
+        data=json.dumps(payload),
+        content_type="application/json",
+    )
+    rows = {
+        r.name: (r.day, r.spent_cents, r.paid_cents)
+        for r in ExpenseDailyRollup.query.filter_by(plan_id=plan.id)
+    }
+    assert rows == {
+        "owner": (date(2025, 5, 2), 1000, 3000),
+        "Bob": (date(2025, 5, 2), 2000, 0),
+    }
+
+    expense_id = plan.expenses[0].id
+    client.delete(f"/plans/{plan.hash_id}/section/expenses/{expense_id}")
+    rows = [(r.spent_cents, r.paid_cents) for r in ExpenseDailyRollup.query]
+    assert rows == [(0, 0), (0, 0)]
+
+
+def test_spending_timeseries_buckets_and_downsampling(plan_factory):
+    plan = plan_factory()
+    _add(plan, datetime(2025, 1, 6), 20.0, "Alice", {"Alice": 10.0, "Bob": 10.0})
+    _add(plan, datetime(2025, 1, 8), 8.0, "Bob", {"Bob": 8.0})
+    _add(plan, datetime(2025, 1, 8), 5.0, "Bob", {"Alice": 5.0}, description="Reimbursement")
+    _add(plan, datetime(2025, 3, 1), 4.0, "Alice", {"Alice": 4.0})
+
+    # Rollups are built lazily from raw rows on first read
+    daily = spending_timeseries(plan.id, date(2025, 1, 6), date(2025, 1, 8), bucket="day")
+    assert daily["bucket"] == "day"
+    assert daily["labels"] == ["2025-01-06", "2025-01-07", "2025-01-08"]
+    assert daily["series"]["Bob"] == {"spent": [10.0, 0.0, 8.0], "paid": [0.0, 0.0, 8.0]}
+
+    # Too many days for max_points: coarsened to weeks, then months
+    assert choose_bucket(date(2025, 1, 1), date(2025, 3, 31), "day", 20) == "week"
+    monthly = spending_timeseries(plan.id, date(2025, 1, 1), date(2025, 3, 31), max_points=5)
+    assert monthly["bucket"] == "month"
+    assert monthly["series"]["Alice"]["spent"] == [10.0, 0.0, 4.0]
+    assert choose_bucket(date(2000, 1, 1), date(2009, 12, 31), "auto", 5) is None
+
+
+def test_timeseries_api(client, user_factory, plan_factory):
+    u = user_factory("owner", password="pw")
+    client.post("/login", data={"username": "owner", "password": "pw"}, follow_redirects=True)
+    plan = plan_factory(owner=u)
+    _add(plan, datetime(2025, 2, 3), 12.0, "Alice", {"Alice": 6.0, "Bob": 6.0})
+
+    url = f"/plans/api/plans/{plan.hash_id}/statistics/timeseries"
+    resp = client.get(f"{url}?start=2025-02-01&end=2025-02-28&bucket=week")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["bucket"] == "week"
+    assert data["labels"][0] == "2025-01-27"
+    assert data["series"]["Alice"]["paid"][1] == 12.0
+
+    assert client.get(f"{url}?start=2025-02-28&end=2025-02-01").status_code == 400
+    assert client.get(f"{url}?bucket=hour").status_code == 400
+
+    # Ranges touching the ends of the calendar stop at the last bucket instead of failing
+    for bucket in ("day", "week", "month", "year"):
+        resp = client.get(f"{url}?start=9999-12-01&end=9999-12-31&bucket={bucket}")
+        assert resp.status_code == 200
+    assert client.get(f"{url}?end=0001-01-05").status_code == 400
+
+    # More years than max_points cannot be downsampled any further
+    resp = client.get(f"{url}?start=0001-01-01&end=9999-12-31")
+    assert resp.status_code == 400
+    assert "120 years" in resp.get_json()["error"]
+    assert client.get(f"{url}?start=2000-01-01&end=2009-12-31&max_points=5").status_code == 400
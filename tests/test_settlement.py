@@ -0,0 +1,45 @@
+from backend.routes.plans import calculate_reimbursements
+from backend.utils.settlement import settle_balances
+
+
+def _net(balances, transfers):
+    net = dict(balances)
+    for t in transfers:
+        net[t["from"]] = round(net[t["from"]] + t["amount"], 2)
+        net[t["to"]] = round(net[t["to"]] - t["amount"], 2)
+    return net
+
+
+def test_settle_balances_uses_fewer_transfers_than_greedy():
+    # Two independent triangles interleaved so greedy pairing crosses them
+    balances = {
+        "A": -30.0,
+        "D": -25.0,
+        "B": -20.0,
+        "E": -5.0,
+        "C": 50.0,
+        "F": 30.0,
+    }
+    transfers = settle_balances(balances)
+    assert all(v == 0 for v in _net(balances, transfers).values())
+    assert len(transfers) == 4
+    assert len(calculate_reimbursements(balances)) == 5
+
+
+def test_settle_balances_exact_pairs_and_budget_fallback():
+    balances = {"A": 10.0, "B": -10.0, "C": 5.0, "D": 3.0, "E": -8.0}
+    assert settle_balances(balances)[0] == {"from": "B", "to": "A", "amount": 10.0}
+
+    # With no search budget the remainder is still fully settled greedily
+    transfers = settle_balances(balances, node_budget=0)
+    assert all(v == 0 for v in _net(balances, transfers).values())
+
+
+def test_settle_balances_is_never_longer_than_greedy():
+    # Greedy closes four zero-sum groups in listing order (10 transfers); the
+    # subset search used to take a triple spanning two of them and needed 11
+    amounts = [-20, -3, -30, -22, -27, -24, -21, -17, -26, 53, 73, 12, 9, 43]
+    balances = {f"P{i}": float(v) for i, v in enumerate(amounts)}
+    transfers = settle_balances(balances)
+    assert all(v == 0 for v in _net(balances, transfers).values())
+    assert len(transfers) == len(calculate_reimbursements(balances)) == 10
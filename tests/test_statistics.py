@@ -2,7 +2,9 @@ from backend.routes.plans import (
     calculate_balance,
     calculate_expense,
     calculate_real_expense,
+    calculate_reimbursements,
 )
+from backend.utils.stats import aggregate_plan_totals, compute_plan_totals
 
 
 def test_statistics_reimbursement_excluded():
@@ -39,3 +41,55 @@ def test_statistics_reimbursement_excluded():
     # Real expense: Dinner 60 by Alice, reimbursement 30 from Bob makes totals equalized
     assert real.get("Alice") == 30.0
     assert real.get("Bob") == 30.0
+
+
+def test_statistics_integer_cents_leave_no_residue():
+    # 0.1 + 0.2 style float drift must not leave fractional-cent balances
+    expenses = [
+        {
+            "id": i,
+            "name": "Snack",
+            "amount": 0.3,
+            "payer": "Alice",
+            "participants": ["Alice", "Bob", "Carol"],
+            "amount_details": {"Alice": 0.1, "Bob": 0.1, "Carol": 0.1},
+        }
+        for i in range(10)
+    ]
+
+    balances = calculate_balance(expenses)
+    assert balances == {"Alice": 2.0, "Bob": -1.0, "Carol": -1.0}
+    assert calculate_expense(expenses) == {"Alice": 1.0, "Bob": 1.0, "Carol": 1.0}
+    assert calculate_real_expense(expenses) == {"Alice": 3.0, "Bob": 0.0, "Carol": 0.0}
+
+    reimbursements = calculate_reimbursements({"Alice": 0.3, "Bob": -0.1, "Carol": -0.2})
+    assert reimbursements == [
+        {"from": "Bob", "to": "Alice", "amount": 0.1},
+        {"from": "Carol", "to": "Alice", "amount": 0.2},
+    ]
+
+
+def test_aggregate_plan_totals_matches_replay(plan_factory, expense_factory):
+    plan = plan_factory()
+    expense_factory(plan=plan, amount=60.0, payer_name="Alice")
+    expense_factory(plan=plan, amount=45.5, payer_name="Carol", shares={"Bob": 45.5})
+    expense_factory(
+        plan=plan,
+        description="Reimbursement",
+        amount=30.0,
+        payer_name="Bob",
+        shares={"Alice": 30.0},
+    )
+    expenses = [
+        {
+            "name": e.description,
+            "amount": e.amount,
+            "payer": e.payer_name,
+            "participants": [s.name for s in e.shares],
+            "amount_details": {s.name: s.amount for s in e.shares},
+        }
+        for e in plan.expenses
+    ]
+
+    _, total_expense, real_expense = compute_plan_totals(expenses)
+    assert aggregate_plan_totals(plan.id) == (total_expense, real_expense)